@@ -0,0 +1,2 @@
+from .async_tello import AsyncTello
+from .bridge import TelloBridge
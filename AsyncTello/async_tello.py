@@ -0,0 +1,442 @@
+import asyncio
+import collections
+import re
+import time
+
+from djitellopy import Tello, TelloException
+
+
+# What the answer to each read query looks like. An answer that doesn't fit the oldest outstanding
+# query means the answer to that one was lost: it's retried instead of being handed the wrong value
+ANSWER_PATTERNS = {
+    'battery?': r'\d+',
+    'height?': r'-?\d+dm',
+    'speed?': r'[\d.]+',
+    'time?': r'\d+s',
+    'tof?': r'\d+mm',
+    'temp?': r'\d+~\d+C',
+    'baro?': r'-?[\d.]+',
+    'wifi?': r'[\w.]+',
+    'sdk?': r'\w+',
+    'sn?': r'\w+',
+}
+ANSWER_PATTERNS = {query: re.compile(pattern) for query, pattern in ANSWER_PATTERNS.items()}
+# Queries whose answers can look alike: never in flight together, a lost answer couldn't be noticed.
+# 'text' answers (wifi?, sdk?, sn?) can look like any other, unknown queries too
+ANSWER_SHAPES = {
+    'battery?': 'number',
+    'speed?': 'number',
+    'baro?': 'number',
+    'height?': 'dm',
+    'time?': 's',
+    'tof?': 'mm',
+    'temp?': 'temperature',
+}
+CONTROL_ANSWER = re.compile(r'ok|error.*|out of range|Not joystick', re.IGNORECASE)
+
+
+def _shapes_overlap(query, other):
+    shape, other_shape = ANSWER_SHAPES.get(query, 'text'), ANSWER_SHAPES.get(other, 'text')
+    return shape == other_shape or 'text' in (shape, other_shape)
+
+
+def _number(answer):
+    """'10dm', '801mm', '12s' -> 10, 801, 12: the value of a query answer without its unit."""
+    return int(answer.strip().rstrip('abcdefghijklmnopqrstuvwxyz').split('.')[0])
+
+
+class _DatagramHandler(asyncio.DatagramProtocol):
+    """Hands every datagram of an endpoint to `on_datagram(data, address)`."""
+
+    def __init__(self, on_datagram):
+        self.on_datagram = on_datagram
+
+    def datagram_received(self, data, address):
+        self.on_datagram(data, address)
+
+    def error_received(self, exc):
+        print("tello: socket error: %s" % exc)
+
+
+class AsyncTello:
+    """
+    asyncio client for the Tello: commands (UDP 8889), state (8890) and video (11111).
+
+    Commands are coroutines with a timeout and retries. The Tello answers in the order it got
+    the commands and its answers carry no id, so they're matched to the outstanding commands
+    first in, first out:
+
+    - control commands (takeoff, move_*, ...) go alone: they wait for every outstanding answer,
+      and nothing is sent until theirs arrived.
+    - read queries (battery?, height?, ...) are pipelined: up to `max_in_flight` of them are sent
+      back to back without waiting, query_many() sends a batch of them at once.
+
+    A command that times out keeps its place in the line for another `timeout`: its answer may
+    still come, and must not be taken for the next command's. The command is retried once that
+    answer came or the place expired. Answers are checked against the shape expected for their
+    query (ANSWER_PATTERNS): one that can only belong to a later command shows the earlier
+    answer was lost, that command is retried at once. Queries whose answers can look alike (battery? and speed?, see ANSWER_SHAPES) are
+    never in flight together, so a lost answer can't hand one the other's value.
+
+    Consecutive commands are at least `command_interval` seconds apart (djitellopy's
+    TIME_BTW_COMMANDS by default, the drone drops commands that come too fast; 0 pipelines
+    freely). emergency() and send_rc_control() are sent right away. emergency() fails the
+    commands waiting for an answer; their answers and its own 'ok' are still expected and
+    thrown away, so none of them is taken for a later command's.
+
+    The state stream is parsed like djitellopy does (Tello.parse_state) into `state`, and
+    handed to `on_state(state)` if given (e.g. Telemetry.publish). The video port is only
+    opened with an `on_video(datagram)` callback. Port None: not opened (state_port=None when
+    djitellopy already owns 8890 in this process). djitellopy-style names are kept (move_up,
+    query_battery, get_height, send_control_command...), so through a TelloBridge this can stand
+    in for a Tello in the synchronous code.
+    """
+
+    def __init__(self, host=Tello.TELLO_IP, command_port=Tello.CONTROL_UDP_PORT,
+                 local_command_port=Tello.CONTROL_UDP_PORT, state_port=Tello.STATE_UDP_PORT, video_port=None,
+                 timeout=Tello.RESPONSE_TIMEOUT, retries=2, max_in_flight=4, command_interval=Tello.TIME_BTW_COMMANDS,
+                 on_state=None, on_video=None):
+        self.address = (host, command_port)
+        self.local_command_port = local_command_port
+        self.state_port = state_port
+        self.video_port = video_port if on_video is not None else None
+        self.timeout = timeout
+        self.retries = retries  # extra attempts after a timeout or an 'error' answer
+        self.max_in_flight = max_in_flight
+        self.command_interval = command_interval
+        self.on_state = on_state
+        self.on_video = on_video
+
+        self.state = {}
+        self.last_received_command_timestamp = time.time()  # same name as djitellopy, for Keepalive
+
+        self._transports = []
+        self._command_transport = None
+        # (future, answer pattern, command) of the sent commands, in sending order. Pattern None takes any answer
+        self._outstanding = collections.deque()
+        self._drained = None  # set while nothing is outstanding
+        self._settled = []  # futures of queries waiting for an outstanding one to leave the line
+        self._send_lock = None
+        self._slots = None
+        self._last_sent = 0.0
+
+        self.sent = 0
+        self.answered = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.unexpected = 0  # answers nobody was waiting for (late answers of timed out commands)
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._send_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        self._command_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramHandler(self._on_answer), local_addr=('0.0.0.0', self.local_command_port))
+        self._transports.append(self._command_transport)
+        if self.state_port is not None:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramHandler(self._on_state), local_addr=('0.0.0.0', self.state_port))
+            self._transports.append(transport)
+        if self.video_port is not None:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramHandler(lambda data, _: self.on_video(data)), local_addr=('0.0.0.0', self.video_port))
+            self._transports.append(transport)
+        return self
+
+    async def close(self):
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+        self._command_transport = None
+        while self._outstanding:
+            future, _, _ = self._outstanding.popleft()
+            if not future.done():
+                future.set_exception(TelloException("tello: client closed."))
+        if self._drained is not None:
+            self._left_line()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Raw commands
+
+    async def send_command(self, command, timeout=None, retries=None, pipelined=False):
+        """Send `command` and return the Tello's answer, retrying after a timeout."""
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            if attempt:
+                self.retried += 1
+            try:
+                return await self._transact(command, timeout, pipelined)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+        raise TelloException("tello: no answer to '%s' after %d tries of %.1f s." % (command, retries + 1, timeout))
+
+    async def send_control_command(self, command, timeout=None, retries=None):
+        """A command answered with 'ok', retried on timeouts and on an 'error' answer."""
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        answer = "no answer"
+        for attempt in range(retries + 1):
+            if attempt:
+                self.retried += 1
+            try:
+                answer = await self._transact(command, timeout, False)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                continue
+            if 'ok' in answer.lower():
+                return True
+        raise TelloException("tello: '%s' failed after %d tries, last answer '%s'." % (command, retries + 1, answer))
+
+    async def send_read_command(self, command, timeout=None):
+        """A read query ('battery?'...), pipelined with the other queries."""
+        answer = await self.send_command(command, timeout, pipelined=True)
+        if any(word in answer for word in ('error', 'ERROR', 'False')):
+            raise TelloException("tello: query '%s' failed: '%s'." % (command, answer))
+        return answer
+
+    async def query_many(self, *commands):
+        """Send independent read queries at once, returns their answers in order."""
+        return await asyncio.gather(*(self.send_read_command(command) for command in commands))
+
+    def send_command_without_return(self, command):
+        self._command_transport.sendto(command.encode('utf-8'), self.address)
+        self._last_sent = time.monotonic()
+        self.sent += 1
+
+    # djitellopy's commands
+
+    async def connect(self):
+        await self.send_control_command('command')
+
+    async def send_keepalive(self):
+        await self.send_control_command('keepalive')
+
+    async def takeoff(self):
+        await self.send_control_command('takeoff', timeout=Tello.TAKEOFF_TIMEOUT)
+
+    async def land(self):
+        await self.send_control_command('land')
+
+    def emergency(self):
+        # Not paced, not behind the lock: the commands in flight fail, their slots stay to take their answers
+        loop = asyncio.get_running_loop()
+        for index, (future, _, command) in enumerate(self._outstanding):
+            if not future.done():
+                future.set_exception(TelloException("tello: '%s' cancelled by emergency." % command))
+            self._outstanding[index] = (self._discard(loop), None, command)
+        self._outstanding.append((self._discard(loop), None, 'emergency'))
+        self._drained.clear()
+        self.send_command_without_return('emergency')
+
+    async def streamon(self):
+        await self.send_control_command('streamon')
+
+    async def streamoff(self):
+        await self.send_control_command('streamoff')
+
+    async def move(self, direction, x):
+        await self.send_control_command('%s %d' % (direction, x))
+
+    async def move_up(self, x):
+        await self.move('up', x)
+
+    async def move_down(self, x):
+        await self.move('down', x)
+
+    async def move_left(self, x):
+        await self.move('left', x)
+
+    async def move_right(self, x):
+        await self.move('right', x)
+
+    async def move_forward(self, x):
+        await self.move('forward', x)
+
+    async def move_back(self, x):
+        await self.move('back', x)
+
+    async def rotate_clockwise(self, x):
+        await self.send_control_command('cw %d' % x)
+
+    async def rotate_counter_clockwise(self, x):
+        await self.send_control_command('ccw %d' % x)
+
+    async def flip(self, direction):
+        await self.send_control_command('flip %s' % direction)
+
+    async def flip_left(self):
+        await self.flip('l')
+
+    async def flip_right(self):
+        await self.flip('r')
+
+    async def flip_forward(self):
+        await self.flip('f')
+
+    async def flip_back(self):
+        await self.flip('b')
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        values = (left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+        self.send_command_without_return('rc %d %d %d %d' % tuple(max(-100, min(100, int(v))) for v in values))
+
+    async def query_battery(self):
+        return int(await self.send_read_command('battery?'))
+
+    async def query_height(self):
+        return _number(await self.send_read_command('height?'))  # in the drone's unit (dm), like the answer
+
+    async def query_speed(self):
+        return int(await self.send_read_command('speed?'))
+
+    async def query_flight_time(self):
+        return _number(await self.send_read_command('time?'))
+
+    async def query_distance_tof(self):
+        return _number(await self.send_read_command('tof?'))
+
+    async def query_temperature(self):
+        return await self.send_read_command('temp?')
+
+    async def query_sdk_version(self):
+        return await self.send_read_command('sdk?')
+
+    # State, from the 8890 stream (no command sent)
+
+    def get_state_field(self, key):
+        return self.state.get(key)
+
+    def get_height(self):
+        return self.state.get('h')
+
+    def get_distance_tof(self):
+        return self.state.get('tof')
+
+    def get_battery(self):
+        return self.state.get('bat')
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'answered': self.answered,
+            'timeouts': self.timeouts,
+            'retried': self.retried,
+            'unexpected': self.unexpected,
+            'in_flight': len(self._outstanding),
+        }
+
+    async def _transact(self, command, timeout, pipelined):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if pipelined:
+            await self._slots.acquire()
+            try:
+                async with self._send_lock:
+                    while any(_shapes_overlap(command, other) for _, _, other in self._outstanding):
+                        settled = loop.create_future()
+                        self._settled.append(settled)
+                        await settled
+                    await self._pace()
+                    self._send(command, future)
+                return await self._wait(future, timeout)
+            finally:
+                self._slots.release()
+
+        # Control commands go alone: after every outstanding answer, nothing behind them until answered
+        async with self._send_lock:
+            await self._drained.wait()
+            await self._pace()
+            self._send(command, future)
+            return await self._wait(future, timeout)
+
+    async def _pace(self):
+        delay = self._last_sent + self.command_interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _send(self, command, future):
+        pattern = ANSWER_PATTERNS.get(command) if command.endswith('?') else CONTROL_ANSWER
+        self._outstanding.append((future, pattern, command))
+        self._drained.clear()
+        self.send_command_without_return(command)
+
+    def _discard(self, loop):
+        """Slot future for an answer nobody reads, given up after the timeout."""
+        future = loop.create_future()
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())  # nobody to raise to
+        loop.call_later(self.timeout, self._remove, future)
+        return future
+
+    def _keep_place(self, future):
+        """A timed out command's place goes to a _discard() slot, that takes its late answer."""
+        for index, (entry_future, pattern, command) in enumerate(self._outstanding):
+            if entry_future is future:
+                self._outstanding[index] = (self._discard(asyncio.get_running_loop()), pattern, command)
+                break
+        future.cancel()
+
+    def _remove(self, future):
+        """Take `future` out of the line, so the answers behind it go to the right commands."""
+        for entry in self._outstanding:
+            if entry[0] is future:
+                self._outstanding.remove(entry)
+                break
+        future.cancel()
+        self._left_line()
+
+    def _left_line(self):
+        for settled in self._settled:
+            if not settled.done():
+                settled.set_result(None)
+        self._settled = []
+        if not self._outstanding:
+            self._drained.set()
+
+    async def _wait(self, future, timeout):
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # Still in the line (unless a later answer showed its own was lost): a control command or a
+            # query of the same shape waits for the late answer to come, or for the place to expire
+            self._keep_place(future)
+            raise
+
+    def _on_answer(self, data, address):
+        if address[0] != self.address[0]:
+            return
+        self.last_received_command_timestamp = time.time()
+        answer = data.decode('utf-8', errors='replace').rstrip('\r\n')
+        while self._outstanding:
+            future, pattern, _ = self._outstanding.popleft()
+            if future.done():
+                continue
+            if pattern is None or pattern.fullmatch(answer) or answer.lower().startswith('error'):
+                future.set_result(answer)
+                self.answered += 1
+                break
+            # Its answer was lost, this one belongs to a later command
+            future.set_exception(asyncio.TimeoutError())
+        else:
+            self.unexpected += 1
+        self._left_line()
+
+    def _on_state(self, data, address):
+        if address[0] != self.address[0]:
+            return
+        try:
+            state = Tello.parse_state(data.decode('ASCII'))
+        except UnicodeDecodeError:
+            return
+        if state:
+            self.state = state
+            if self.on_state is not None:
+                self.on_state(state)
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+# AsyncTello methods that send right away without an answer: run on the loop, not awaited
+NOWAIT = ('emergency', 'send_rc_control', 'send_command_without_return')
+
+
+class TelloBridge:
+    """
+    Blocking front of an AsyncTello for threads: the client runs on an event loop in a thread
+    of its own and bridge.move_up(20) waits for the coroutine like the djitellopy call would.
+    Any number of threads can call it at the same time, the client orders their commands (and
+    pipelines their queries). Plain attributes and the get_* state readers are read directly.
+    """
+
+    def __init__(self, client, timeout=None):
+        self.client = client
+        self.timeout = timeout  # on top of the client's own timeouts and retries (None: none)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        self.run(client.open())
+
+    def run(self, coroutine):
+        """Run a coroutine on the client's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(self.timeout)
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        self.run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if asyncio.iscoroutinefunction(attribute):
+            return lambda *args, **kwargs: self.run(attribute(*args, **kwargs))
+        if name in NOWAIT:
+            # The transport is the loop's, only touched from its thread
+            return lambda *args: self.loop.call_soon_threadsafe(attribute, *args)
+        return attribute
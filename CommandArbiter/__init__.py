@@ -0,0 +1,3 @@
+from .command_arbiter import (CommandArbiter, CommandProxy, Command, EMERGENCY, LANDING, MANUAL, MISSION, HOUSEKEEPING,
+                              PRIORITY_NAMES)
+from .keepalive import Keepalive
@@ -0,0 +1,359 @@
+import heapq
+import threading
+import time
+
+from djitellopy import Tello, TelloException
+
+# Priority classes, lower runs first
+EMERGENCY = 0
+LANDING = 1
+MANUAL = 2
+MISSION = 3
+HOUSEKEEPING = 4
+PRIORITY_NAMES = ('emergency', 'landing', 'manual', 'mission', 'housekeeping')
+
+# A command that waited longer than this in the queue is dropped instead of sent (None: waits as long as it takes).
+# A keypress from 3 s ago or a keepalive behind a long manoeuvre is no longer what anybody wants
+DEFAULT_MAX_WAIT = {MANUAL: 3.0, HOUSEKEEPING: 5.0}
+
+# Commands whose answer a pending identical command can share
+COALESCED = ('connect', 'send_keepalive')
+
+
+def _coalesced(name):
+    return name.startswith('query_') or name in COALESCED
+
+
+class Command:
+    """One queued call of a Tello method. wait() blocks until it was sent and answered."""
+
+    __slots__ = ('name', 'args', 'kwargs', 'priority', 'seq', 'max_wait', 'submitted', 'started', 'finished',
+                 'result', 'error', 'preempted', 'done')
+
+    def __init__(self, name, args, kwargs, priority, seq, max_wait):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.seq = seq
+        self.max_wait = max_wait
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.preempted = None  # 'emergency' or 'landing' if one cut in while it was running
+        self.done = threading.Event()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def __repr__(self):
+        return "Command(%s%r, %s)" % (self.name, self.args, PRIORITY_NAMES[self.priority])
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TelloException("arbiter: no answer to '%s' after %.1f s." % (self.name, timeout))
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class CommandProxy:
+    """
+    The drone as seen by one priority class: proxy.move_up(20) is queued at that priority and
+    blocks until it was answered, like the Tello method. get_* (djitellopy's cached state) and
+    other attributes are read from the drone directly, no command is sent for them.
+    """
+
+    def __init__(self, arbiter, priority):
+        self._arbiter = arbiter
+        self._priority = priority
+
+    def __getattr__(self, name):
+        attribute = getattr(self._arbiter.drone, name)
+        if not callable(attribute) or name.startswith('get_'):
+            return attribute
+        if name == 'emergency':
+            return self._arbiter.emergency
+        if name == 'land':
+            return self._arbiter.land
+        if name == 'send_rc_control':
+            return lambda *args: self._arbiter.send_rc_control(self._priority, *args)
+        return lambda *args, **kwargs: self._arbiter.call(self._priority, name, *args, **kwargs)
+
+
+class CommandArbiter:
+    """
+    Single owner of the Tello command socket (UDP 8889).
+
+    Every command goes through one worker thread that sends them one at a time, the pending
+    ones ordered by priority class (emergency > landing > manual > mission > housekeeping),
+    first come first served within a class. Identical pending queries (query_*, connect,
+    keepalive) share one round trip. Commands that waited more than their class's max wait
+    are dropped with a TelloException.
+
+    emergency() doesn't queue at all: it's sent right away from the caller's thread, even while
+    another command waits for its answer, and every pending command is cancelled. land() cancels
+    the pending manual, mission and housekeeping commands, stops a running manoeuvre ('stop',
+    the drone hovers) and runs next. A preempted command fails with a TelloException.
+
+    Every command sent is owed an answer. The ones nobody took (to 'emergency', 'stop', a
+    preempted or timed out command) are counted, and that many answers are waited for and
+    dropped before the next command is sent, at most `owed_timeout` seconds (lost answers).
+
+    send_rc_control() is fire and forget (no answer to wait for), it's sent directly, unless a
+    command of a higher class is running or pending, then it's dropped.
+    """
+
+    def __init__(self, drone, max_wait=None, owed_timeout=Tello.RESPONSE_TIMEOUT):
+        self.drone = drone
+        self.max_wait = dict(DEFAULT_MAX_WAIT if max_wait is None else max_wait)
+        self.owed_timeout = owed_timeout
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue = []  # heap of pending Commands
+        self._pending = {}  # (name, args) -> pending or running Command, for coalescing
+        self._running = None
+        self._seq = 0
+        self._owed = 0  # answers the drone still has to send, that no command is waiting for
+
+        self.running = False
+        self._thread = None
+
+        self._classes = [{'commands': 0, 'coalesced': 0, 'cancelled': 0, 'timeouts': 0, 'errors': 0,
+                          'preempted': 0, 'wait_seconds': 0.0, 'latency_seconds': 0.0, 'max_latency': 0.0}
+                         for _ in PRIORITY_NAMES]
+        self._commands = {}  # name -> [count, total seconds, max seconds], from submission to answer
+        self.rc_sent = 0
+        self.rc_dropped = 0
+        self.stale_dropped = 0  # owed answers thrown away
+        self.stale_lost = 0  # owed answers that never came
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+        # Every command the worker sends goes through here: the answers owed by earlier commands are dropped
+        # first, and one is owed until this command got its own. djitellopy retries a command whose answer
+        # wasn't 'ok': a preempted manoeuvre would be sent again, its retries are answered here instead
+        original = self.drone.send_command_with_return
+
+        def send_command_with_return(command, timeout=Tello.RESPONSE_TIMEOUT):
+            if threading.current_thread() is not self._thread:
+                return original(command, timeout=timeout)
+            self._drop_owed()
+            with self._lock:
+                running = self._running
+                if running is not None and running.preempted:
+                    return "arbiter: preempted"
+                self._owed += 1
+            response = original(command, timeout=timeout)
+            if not response.startswith('Aborting'):  # djitellopy's no answer, it may still come
+                with self._lock:
+                    self._owed -= 1
+            return response
+
+        self.drone.send_command_with_return = send_command_with_return
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self.running = False
+            self._cancel(lambda command: True, "arbiter stopped")
+            self._wakeup.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.drone.__dict__.pop('send_command_with_return', None)
+
+    def proxy(self, priority):
+        return CommandProxy(self, priority)
+
+    def submit(self, priority, name, *args, **kwargs):
+        """Queue drone.<name>(*args, **kwargs), returns the Command (see Command.wait())."""
+        with self._lock:
+            if not self.running:
+                raise TelloException("arbiter: not running, '%s' not sent." % name)
+            key = (name, args)
+            if _coalesced(name) and not kwargs and key in self._pending:
+                command = self._pending[key]
+                self._classes[priority]['coalesced'] += 1
+                if priority < command.priority and command.started is None:
+                    # Promote the shared command to the most urgent of its callers
+                    self._queue.remove(command)
+                    command.priority = priority
+                    heapq.heapify(self._queue)
+                return command
+
+            self._seq += 1
+            command = Command(name, args, kwargs, priority, self._seq, self.max_wait.get(priority))
+            if _coalesced(name) and not kwargs:
+                self._pending[key] = command
+            heapq.heappush(self._queue, command)
+            self._wakeup.notify()
+            return command
+
+    def call(self, priority, name, *args, **kwargs):
+        """Queue a command and wait for its result, raises what the Tello method raised."""
+        return self.submit(priority, name, *args, **kwargs).wait()
+
+    def emergency(self):
+        """Stops the motors now, whatever is running or queued."""
+        started = time.monotonic()
+        self.drone.emergency()  # not waited for, safe next to a running command
+        with self._lock:
+            self._owed += 1  # the drone answers 'ok' all the same
+            self._cancel(lambda command: True, "emergency")
+            self._preempt_running("emergency")
+            stats = self._classes[EMERGENCY]
+            stats['commands'] += 1
+            self._account('emergency', stats, time.monotonic() - started)
+        print("arbiter: emergency sent")
+
+    def land(self):
+        """Lands as the next command: cancels lower classes and stops a running manoeuvre."""
+        with self._lock:
+            self._cancel(lambda command: command.priority > LANDING, "landing")
+            running = self._running
+            if running is not None and running.priority > LANDING:
+                self._preempt_running("landing")
+                self.drone.send_command_without_return('stop')  # hover now instead of finishing the move
+                self._owed += 1
+                print("arbiter: stopped '%s' to land" % running.name)
+        return self.call(LANDING, 'land')
+
+    def send_rc_control(self, priority, left_right, forward_backward, up_down, yaw):
+        with self._lock:
+            running = self._running
+            if (running is not None and running.priority < priority) or \
+                    (self._queue and self._queue[0].priority < priority):
+                self.rc_dropped += 1
+                return
+            self.rc_sent += 1
+        self.drone.send_rc_control(left_right, forward_backward, up_down, yaw)
+
+    def stats(self):
+        with self._lock:
+            classes = {}
+            for name, stats in zip(PRIORITY_NAMES, self._classes):
+                answered = stats['commands']
+                classes[name] = {
+                    'commands': answered,
+                    'coalesced': stats['coalesced'],
+                    'cancelled': stats['cancelled'],
+                    'timeouts': stats['timeouts'],
+                    'errors': stats['errors'],
+                    'preempted': stats['preempted'],
+                    'mean_wait_ms': 1000 * stats['wait_seconds'] / answered if answered else 0.0,
+                    'mean_latency_ms': 1000 * stats['latency_seconds'] / answered if answered else 0.0,
+                    'max_latency_ms': 1000 * stats['max_latency'],
+                }
+            commands = {name: {'count': count, 'mean_ms': 1000 * total / count, 'max_ms': 1000 * longest}
+                        for name, (count, total, longest) in self._commands.items()}
+            return {
+                'classes': classes,
+                'commands': commands,
+                'pending': len(self._queue),
+                'rc_sent': self.rc_sent,
+                'rc_dropped': self.rc_dropped,
+                'stale_dropped': self.stale_dropped,
+                'stale_lost': self.stale_lost,
+            }
+
+    def _cancel(self, predicate, reason):
+        """Fails the pending commands matching `predicate`. Called with the lock held."""
+        kept = []
+        for command in self._queue:
+            if predicate(command):
+                self._classes[command.priority]['cancelled'] += 1
+                self._finish(command, error=TelloException("arbiter: '%s' cancelled by %s." % (command.name, reason)))
+            else:
+                kept.append(command)
+        heapq.heapify(kept)
+        self._queue = kept
+
+    def _preempt_running(self, reason):
+        running = self._running
+        if running is not None and not running.preempted:
+            running.preempted = reason
+            self._classes[running.priority]['preempted'] += 1
+
+    def _drop_owed(self):
+        """Wait for the owed answers and throw them away, so the next one is the next command's."""
+        responses = self.drone.get_own_udp_object()['responses']
+        give_up = time.monotonic() + self.owed_timeout
+        while True:
+            with self._lock:
+                if self._owed <= 0:
+                    # Nobody asked for whatever else is there
+                    self._owed = 0
+                    responses.clear()
+                    return
+                if responses:
+                    responses.pop(0)
+                    self._owed -= 1
+                    self.stale_dropped += 1
+                    continue
+                if time.monotonic() >= give_up:
+                    print("arbiter: %d answers never came, going on" % self._owed)
+                    self.stale_lost += self._owed
+                    self._owed = 0
+                    continue
+            time.sleep(0.01)
+
+    def _finish(self, command, result=None, error=None):
+        command.finished = time.monotonic()
+        command.result = result
+        command.error = error
+        if self._pending.get((command.name, command.args)) is command:
+            del self._pending[(command.name, command.args)]
+        command.done.set()
+
+    def _account(self, name, stats, latency):
+        stats['latency_seconds'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+        count, total, longest = self._commands.get(name, (0, 0.0, 0.0))
+        self._commands[name] = (count + 1, total + latency, max(longest, latency))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self.running and not self._queue:
+                    self._wakeup.wait()
+                if not self.running:
+                    return
+                command = heapq.heappop(self._queue)
+                now = time.monotonic()
+                if command.max_wait is not None and now - command.submitted > command.max_wait:
+                    self._classes[command.priority]['timeouts'] += 1
+                    self._finish(command, error=TelloException("arbiter: '%s' waited %.1f s in the queue, dropped."
+                                                               % (command.name, now - command.submitted)))
+                    continue
+                command.started = now
+                self._running = command
+
+            result, error = None, None
+            try:
+                result = getattr(self.drone, command.name)(*command.args, **command.kwargs)
+            except Exception as e:
+                error = e
+
+            with self._lock:
+                self._running = None
+                if command.preempted:
+                    # Whatever answer it read (maybe the one to 'stop'), it didn't finish
+                    result, error = None, TelloException("arbiter: '%s' preempted by %s." % (command.name,
+                                                                                            command.preempted))
+                stats = self._classes[command.priority]
+                stats['commands'] += 1
+                stats['wait_seconds'] += command.started - command.submitted
+                if error is not None:
+                    stats['errors'] += 1
+                    if 'Aborting' in str(error):  # djitellopy's message when the drone never answered
+                        stats['timeouts'] += 1
+                self._finish(command, result, error)
+                self._account(command.name, stats, command.finished - command.submitted)
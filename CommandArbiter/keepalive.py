@@ -0,0 +1,95 @@
+import threading
+import time
+
+
+class Keepalive:
+    """
+    Keeps the Tello from timing out (it lands after ~15 s without a command) without adding traffic.
+
+    Any answered command already proves the link, so the time of the last answer is taken from
+    djitellopy (Tello.last_received_command_timestamp, set by every command of every thread).
+    Only when nothing was answered for `timeout - margin` seconds a keepalive is sent: a bare
+    'command', one short round trip (connect() would also wait for the state stream). `drone`
+    can be a Tello or a CommandProxy, usually the housekeeping one so the keepalive never delays
+    a real command.
+
+    stop() waits up to `timeout` seconds for the thread, a keepalive in flight finishes on its own.
+    stats() reports the liveness of the link: seconds since the last answer, whether that's
+    within the timeout, the longest silence seen and the keepalives sent.
+    """
+
+    def __init__(self, drone, timeout=15.0, margin=5.0, interval=1.0, command='command'):
+        self.drone = drone
+        self.timeout = timeout
+        self.margin = margin
+        self.interval = interval  # how often the idle time is checked, at most
+        self.command = command
+
+        self.keepalives = 0
+        self.failures = 0
+        self.max_idle = 0.0
+        self.alive = True
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        # A keepalive can be queued behind a long manoeuvre in the arbiter: don't wait for it
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                print("link: keepalive still waiting for an answer after %.1f s, left to finish it." % timeout)
+
+    def idle(self):
+        """Seconds since the drone last answered a command."""
+        return max(0.0, time.time() - self.drone.last_received_command_timestamp)
+
+    def stats(self):
+        idle = self.idle()
+        return {
+            'idle_seconds': idle,
+            'alive': idle < self.timeout,
+            'max_idle_seconds': max(self.max_idle, idle),
+            'keepalives': self.keepalives,
+            'failures': self.failures,
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            idle = self.idle()
+            self.max_idle = max(self.max_idle, idle)
+            self._report(idle < self.timeout, idle)
+
+            if idle >= self.timeout - self.margin:
+                try:
+                    self.drone.send_control_command(self.command)
+                    self.keepalives += 1
+                except Exception as e:
+                    # Cancelled by a landing, dropped behind a long manoeuvre (which keeps the link busy
+                    # anyway) or unanswered: checked again at the next interval
+                    self.failures += 1
+                    if not self._stop_event.is_set():
+                        print("link: keepalive failed: %s" % e)
+                    self._stop_event.wait(self.interval)
+                continue
+
+            # Sleep until the link could need a keepalive, checking every `interval` at most
+            self._stop_event.wait(min(self.interval, self.timeout - self.margin - idle))
+
+    def _report(self, alive, idle):
+        if alive != self.alive:
+            self.alive = alive
+            if alive:
+                print("link: drone answering again")
+            else:
+                print("link: no answer from the drone for %.0f s" % idle)
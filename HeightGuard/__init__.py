@@ -1 +1,2 @@
 from .height_guard import HeightGuard
+from .simulated_drone import SimulatedDrone
@@ -1,30 +1,149 @@
-from djitellopy import Tello
+from djitellopy import Tello, TelloException
 import threading
 import time
 
 
 class HeightGuard:
-    def __init__(self, limit=100, config=Tello()):
-        self.drone = config
+    """
+    Keeps the drone at or above `limit` cm.
+
+    mode='step' is the original guard: every 5.17 s, if the drone is below the limit, move_up(20).
+    mode='hold' holds the altitude at `limit` with a PID loop running at `rate` Hz on the
+    telemetry stream (needs `telemetry`), driving the vertical velocity through send_rc_control.
+    `sensor` picks the telemetry field: 'tof' (cm resolution, distance to the floor below) or
+    'h' (height above the takeoff point, in coarser steps). When the newest reading is older
+    than `max_age` seconds (~3 state packets), hold mode stops the vertical motion and waits
+    for the stream to come back instead of steering on an old height.
+
+    The guard starts right away unless autostart is False; stop() ends it and waits up to
+    `timeout` seconds for the thread (a step-mode move already sent finishes in the background).
+    """
+
+    def __init__(self, limit=100, config=None, telemetry=None, mode='step', rate=30, gains=(2.0, 0.6, 0.3),
+                 max_speed=60, sensor='tof', max_age=0.3, autostart=True):
+        # Created here rather than as a default argument, so importing the package doesn't bind the Tello ports
+        self.drone = Tello() if config is None else config
+        # With a Telemetry cache the height comes from the state stream, without any command round trip
+        self.telemetry = telemetry
+        if mode not in ('step', 'hold'):
+            raise Exception("guard: unknown mode '%s'." % mode)
+        if mode == 'hold' and telemetry is None:
+            raise Exception("guard: hold mode needs telemetry.")
+        self.mode = mode
         self.limit = limit
+        self.rate = rate
+        self.kp, self.ki, self.kd = gains
+        self.max_speed = max_speed  # rc units (-100..100)
+        self.sensor = sensor
+        self.max_age = max_age
         self.current_height = 0
+        self.last_command = 0  # last vertical rc value sent in hold mode
+
         self.maintain_height_thread__stop_event = threading.Event()
-        self.maintain_height_thread = threading.Thread(target=self._maintain_height)
+        self.maintain_height_thread = None
+        if autostart:
+            self.start()
+
+    def start(self):
+        if self.maintain_height_thread is not None and self.maintain_height_thread.is_alive():
+            return
+        self.maintain_height_thread__stop_event.clear()
+        target = self._hold_height if self.mode == 'hold' else self._maintain_height
+        self.maintain_height_thread = threading.Thread(target=target)
         self.maintain_height_thread.daemon = True
         self.maintain_height_thread.start()
 
+    def stop(self, timeout=1.0):
+        # Stop the thread, and wait for it unless stop() is called from the guard itself
+        self.maintain_height_thread__stop_event.set()
+        thread = self.maintain_height_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                print("guard: still busy with a command after %.1f s, left to finish it." % timeout)
+
+    def _read_height(self):
+        """:return: (height in cm, time.monotonic of the measurement), (None, None) in hold mode without telemetry"""
+        if self.telemetry is not None:
+            snapshot = self.telemetry.snapshot
+            if snapshot is not None:
+                height = snapshot.tof if self.mode == 'hold' and self.sensor == 'tof' else snapshot.height
+                if height is not None:
+                    return height, snapshot.timestamp
+        if self.mode == 'hold':
+            return None, None
+        # djitellopy's copy of the state, no command needed
+        return self.drone.get_height(), time.monotonic()
+
     def _maintain_height(self):
-        # Consistently check the height of the drone
-        dead = self.maintain_height_thread__stop_event.is_set()
-        while not dead:
-            self.drone.connect()
-            height = self.drone.get_height()
+        # Consistently check the height of the drone (until stop() is called)
+        while not self.maintain_height_thread__stop_event.is_set():
+            height, _ = self._read_height()
             self.current_height = height
 
             if height < self.limit:
-                self.drone.move_up(20)
-            time.sleep(5.17)
+                try:
+                    self.drone.move_up(20)
+                except TelloException as e:
+                    # Failed, or cancelled by an emergency or a landing: the next round decides again
+                    print("guard: move_up failed: %s" % e)
+            self.maintain_height_thread__stop_event.wait(5.17)
 
-    def stop(self):
-        # Stop the thread
-        self.maintain_height_thread__stop_event.set()
+    def _hold_height(self):
+        period = 1.0 / self.rate
+        integral = 0.0
+        derivative = 0.0
+        previous_height = None
+        previous_time = None
+        next_tick = time.monotonic()
+        stale = False
+
+        try:
+            while not self.maintain_height_thread__stop_event.is_set():
+                height, measured_at = self._read_height()
+                if height is None or time.monotonic() - measured_at > self.max_age:
+                    # No recent height: stop climbing or sinking and start over once the stream is back
+                    if not stale:
+                        print("guard: no telemetry for %.1f s, holding still." % self.max_age)
+                        stale = True
+                    if self.last_command != 0:
+                        self.drone.send_rc_control(0, 0, 0, 0)
+                        self.last_command = 0
+                    integral = derivative = 0.0
+                    previous_height = previous_time = None
+                    next_tick = time.monotonic()
+                    self.maintain_height_thread__stop_event.wait(period)
+                    continue
+                if stale:
+                    print("guard: telemetry is back.")
+                    stale = False
+                self.current_height = height
+                error = self.limit - height
+
+                # Derivative on the measurement (no kick when the target changes), only updated when a new
+                # state packet arrived: the loop runs faster than the ~10 Hz state stream
+                if previous_time is None:
+                    previous_height, previous_time = height, measured_at
+                elif measured_at > previous_time:
+                    derivative = -(height - previous_height) / (measured_at - previous_time)
+                    previous_height, previous_time = height, measured_at
+
+                output = self.kp * error + self.ki * integral + self.kd * derivative
+                command = int(max(-self.max_speed, min(self.max_speed, round(output))))
+                if command == round(output):
+                    integral += error * period  # no windup while saturated
+
+                if command != 0 or self.last_command != 0:
+                    self.drone.send_rc_control(0, 0, command, 0)
+                self.last_command = command
+
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    next_tick = time.monotonic()  # fell behind, don't try to catch up
+                    delay = 0
+                self.maintain_height_thread__stop_event.wait(delay)
+        finally:
+            if self.last_command != 0:
+                self.drone.send_rc_control(0, 0, 0, 0)
+                self.last_command = 0
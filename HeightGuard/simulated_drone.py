@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+
+
+class SimulatedDrone:
+    """
+    Stand-in for a Tello in the air, for trying HeightGuard without a drone.
+
+    Models the vertical axis only: the rc vertical command sets a target climb rate
+    (`speed_per_unit` cm/s per rc unit) that the drone reaches with a first order lag of
+    `response_time` seconds, plus a constant `sink_rate` (cm/s, e.g. a tired battery) and
+    whatever disturb() adds. The state is published into a Telemetry (as djitellopy would)
+    at `state_rate` Hz, with 'tof' in cm and 'h' rounded to 10 cm like the real drone.
+    move_up/move_down block while the drone travels, like the SDK commands.
+    """
+
+    def __init__(self, telemetry=None, height=100.0, speed_per_unit=1.0, response_time=0.25, sink_rate=3.0,
+                 noise=0.5, state_rate=10, physics_rate=200, seed=0):
+        self.telemetry = telemetry
+        self.height = height
+        self.velocity = 0.0
+        self.speed_per_unit = speed_per_unit
+        self.response_time = response_time
+        self.sink_rate = sink_rate
+        self.noise = noise
+        self.state_rate = state_rate
+        self.physics_rate = physics_rate
+        self._random = random.Random(seed)
+
+        self._command = 0
+        self._disturbance = 0.0  # cm/s
+        self._lock = threading.Lock()
+        self.rc_commands = 0
+        self.commands = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._physics, daemon=True).start()
+        threading.Thread(target=self._state, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def disturb(self, climb_rate):
+        """Add a vertical disturbance, in cm/s (negative pushes the drone down)."""
+        with self._lock:
+            self._disturbance = climb_rate
+
+    # The Tello methods HeightGuard uses
+
+    def connect(self):
+        self.commands += 1
+
+    def get_height(self):
+        self.commands += 1
+        return int(round(self.height / 10.0)) * 10
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        with self._lock:
+            self._command = max(-100, min(100, up_down_velocity))
+        self.rc_commands += 1
+
+    def move_up(self, x):
+        self._travel(x)
+
+    def move_down(self, x):
+        self._travel(-x)
+
+    def _travel(self, distance):
+        self.commands += 1
+        with self._lock:
+            self.height += distance
+        time.sleep(abs(distance) / 50.0)
+
+    def _physics(self):
+        step = 1.0 / self.physics_rate
+        while self.running:
+            with self._lock:
+                target = self._command * self.speed_per_unit
+                self.velocity += (target - self.velocity) * min(1.0, step / self.response_time)
+                self.height = max(0.0, self.height + (self.velocity - self.sink_rate + self._disturbance) * step)
+            time.sleep(step)
+
+    def _state(self):
+        while self.running:
+            if self.telemetry is not None:
+                measured = self.height + self._random.gauss(0, self.noise)
+                self.telemetry.publish({
+                    'tof': int(round(measured)),
+                    'h': int(round(self.height / 10.0)) * 10,
+                    'vgz': int(round(-self.velocity / 10.0)),  # dm/s, positive down like the Tello
+                    'bat': 80,
+                })
+            time.sleep(1.0 / self.state_rate)
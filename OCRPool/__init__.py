@@ -0,0 +1,11 @@
+from .ocr_pool import OCRPool, create_reader, create_region_reader, create_letter_reader, warm_up
+from .change_gate import ChangeGate
+from .region_detector import RegionDetector, RegionReader
+from .letter_classifier import LetterClassifier, LetterReader
+from .batcher import RecognitionBatcher, BatchedRecognizer, BatchedLetterReaderFactory, mosaic_recognize
+from .detection_aggregator import DetectionAggregator, DetectionEvent
+from .roi_tracker import ROITracker, Track
+from .scale_controller import ScaleController
+from .result_cache import ResultCache, dhash
+from .duty_cycle import DutyCycleGovernor, GROUNDED, SEARCHING, ACTION, LANDING
+from .freshness import FreshnessGate
@@ -0,0 +1,224 @@
+import threading
+import time
+
+import numpy as np
+import cv2
+
+from .letter_classifier import LETTERS, LetterClassifier, LetterReader
+from .ocr_pool import create_reader
+from .result_cache import ResultCache
+
+MOSAIC_HEIGHT = 64  # EasyOCR's recognizer input height, crops are scaled to it anyway
+MOSAIC_GAP = 16
+
+
+def mosaic_recognize(reader, crops, **options):
+    """
+    Recognize every crop in one EasyOCR recognizer batch.
+
+    The crops are scaled to the same height and laid side by side on one canvas, with one
+    box each in horizontal_list, so a single recognize() call covers all of them.
+    :return: [(text, confidence), ...] in the order of `crops` ('' / 0.0 where nothing was read)
+    """
+    scaled = []
+    for crop in crops:
+        height, width = crop.shape[:2]
+        scaled.append(cv2.resize(crop, (max(1, round(width * MOSAIC_HEIGHT / height)), MOSAIC_HEIGHT),
+                                 interpolation=cv2.INTER_AREA if height > MOSAIC_HEIGHT else cv2.INTER_LINEAR))
+
+    canvas = np.full((MOSAIC_HEIGHT, sum(c.shape[1] for c in scaled) + MOSAIC_GAP * (len(scaled) + 1)), 255,
+                     dtype=np.uint8)
+    horizontal_list = []
+    x = MOSAIC_GAP
+    for crop in scaled:
+        canvas[:, x:x + crop.shape[1]] = crop
+        horizontal_list.append([x, x + crop.shape[1], 0, MOSAIC_HEIGHT])
+        x += crop.shape[1] + MOSAIC_GAP
+
+    results = [('', 0.0)] * len(crops)
+    recognized = reader.recognize(canvas, horizontal_list=horizontal_list, free_list=[],
+                                  batch_size=len(crops), **options)
+    # EasyOCR may reorder its output, route each result back by its position on the canvas
+    for bbox, text, confidence in recognized:
+        left = bbox[0][0]
+        for index, (x_min, x_max, _, _) in enumerate(horizontal_list):
+            if x_min - MOSAIC_GAP / 2 <= left < x_max:
+                results[index] = (text, confidence)
+                break
+    return results
+
+
+class _Request:
+    __slots__ = ('crops', 'results', 'submitted', 'done')
+
+    def __init__(self, crops):
+        self.crops = crops
+        self.results = None
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+
+
+class RecognitionBatcher:
+    """
+    Collects crops from concurrent callers (OCR workers reading different frames, or several
+    drones) and runs them through `recognize_batch(crops) -> [(text, confidence), ...]` together.
+
+    A batch is started when `max_batch` crops are waiting or `deadline` seconds after the
+    first of them arrived, whichever comes first; the requests of one caller are never split.
+    recognize() blocks its caller until its own results are back.
+    """
+
+    def __init__(self, recognize_batch, max_batch=8, deadline=0.02):
+        self.recognize_batch = recognize_batch
+        self.max_batch = max_batch
+        self.deadline = deadline
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        self.batches = 0
+        self.crops = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0  # summed over requests, submission until their batch started
+
+    def recognize(self, crops):
+        if not crops:
+            return []
+        request = _Request(crops)
+        with self._condition:
+            if not self.running:
+                raise Exception("ocr: recognition batcher is stopped.")
+            self._pending.append(request)
+            self._condition.notify()
+        request.done.wait()
+        if isinstance(request.results, Exception):
+            raise request.results
+        return request.results
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        self._thread.join(1.0)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'crops': self.crops,
+            'mean_batch_size': self.crops / self.batches if self.batches else 0.0,
+            'mean_batch_ms': 1000 * self.busy_time / self.batches if self.batches else 0.0,
+            'mean_wait_ms': 1000 * self.wait_time / self.crops if self.crops else 0.0,
+        }
+
+    def _pending_crops(self):
+        return sum(len(request.crops) for request in self._pending)
+
+    def _take_batch(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or not self.running)
+            if not self._pending:
+                return None
+            close_at = self._pending[0].submitted + self.deadline
+            while self.running and self._pending_crops() < self.max_batch:
+                remaining = close_at - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [self._pending.pop(0)]
+            size = len(batch[0].crops)
+            while self._pending and size + len(self._pending[0].crops) <= self.max_batch:
+                size += len(self._pending[0].crops)
+                batch.append(self._pending.pop(0))
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            crops = [crop for request in batch for crop in request.crops]
+            try:
+                results = self.recognize_batch(crops)
+            except Exception as exc:
+                for request in batch:
+                    request.results = exc
+                    request.done.set()
+                continue
+            self.busy_time += time.perf_counter() - started
+            self.batches += 1
+            self.crops += len(crops)
+
+            offset = 0
+            for request in batch:
+                self.wait_time += (started - request.submitted) * len(request.crops)
+                request.results = results[offset:offset + len(request.crops)]
+                offset += len(request.crops)
+                request.done.set()
+
+
+class BatchedRecognizer:
+    """
+    Stands in for an easyocr.Reader in LetterReader/RegionReader: recognize() sends the
+    boxes through a shared RecognitionBatcher, readtext() (the full-frame fallback) goes
+    to the reader under `lock`, the one the batcher's recognize calls hold too: EasyOCR
+    readers (and their torch models) are not documented as thread-safe.
+    """
+
+    def __init__(self, reader, batcher, lock):
+        self.reader = reader
+        self.batcher = batcher
+        self.lock = lock
+
+    def readtext(self, image, **options):
+        with self.lock:
+            return self.reader.readtext(image, **options)
+
+    def recognize(self, image, horizontal_list, free_list=None, **options):
+        # options (the allowlist) are those the batcher was built with
+        crops = [image[y_min:y_max, x_min:x_max] for x_min, x_max, y_min, y_max in horizontal_list]
+        results = []
+        for (x_min, x_max, y_min, y_max), (text, confidence) in zip(horizontal_list, self.batcher.recognize(crops)):
+            if text:
+                results.append(([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]], text, confidence))
+        return results
+
+
+class BatchedLetterReaderFactory:
+    """
+    reader_factory for a thread-mode OCRPool: every worker gets its own LetterReader, but
+    they share one LetterClassifier and one EasyOCR reader whose recognizer runs batched
+    across the workers' frames, and the optional ResultCache `cache`. The reader is used by
+    one thread at a time (`reader_lock`): the batcher's batches and the workers' full-frame
+    fallbacks take turns.
+    """
+
+    def __init__(self, max_batch=8, deadline=0.02, reader_factory=create_reader, allowlist=LETTERS, cache=None):
+        self.max_batch = max_batch
+        self.deadline = deadline
+        self.reader_factory = reader_factory
+        self.allowlist = allowlist
+        self.cache = cache
+        self.reader = None
+        self.classifier = None
+        self.batcher = None
+        self.reader_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self.reader is None:
+                self.reader = self.reader_factory()
+                self.classifier = LetterClassifier()
+                self.batcher = RecognitionBatcher(self._recognize_batch, self.max_batch, self.deadline)
+        recognizer = BatchedRecognizer(self.reader, self.batcher, self.reader_lock)
+        return LetterReader(recognizer, classifier=self.classifier, allowlist=self.allowlist, cache=self.cache)
+
+    def _recognize_batch(self, crops):
+        with self.reader_lock:
+            return mosaic_recognize(self.reader, crops, allowlist=self.allowlist)
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import numpy as np
+import cv2
+
+
+class ChangeGate:
+    """
+    Decides whether a frame is worth a full OCR run.
+
+    Each image is reduced to a tiny grayscale signature (`size` pixels, brightness
+    normalized so the Tello's auto exposure doesn't count as a change) and compared with
+    the signature of the last frame that was OCR'd. A frame passes when the mean absolute
+    difference reaches `threshold` grey levels, or when `max_interval` seconds have passed
+    since the last OCR run, so a missed reading is retried even on a still scene.
+    """
+
+    def __init__(self, threshold=6.0, max_interval=1.0, size=(16, 12)):
+        self.threshold = threshold
+        self.max_interval = max_interval
+        self.size = size
+
+        self._last_signature = None
+        self._last_time = None
+        self._lock = threading.Lock()  # shared by all the workers of a pool
+
+        self.checked = 0
+        self.passed = 0
+        self.skipped = 0
+        self.last_score = None
+
+    def signature(self, image):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        return small - small.mean()
+
+    def check(self, image, timestamp=None):
+        """
+        :return: True if `image` should be OCR'd (it then becomes the new reference), False to skip it
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        signature = self.signature(image)
+
+        with self._lock:
+            self.checked += 1
+            if self._last_signature is not None and timestamp - self._last_time < self.max_interval:
+                self.last_score = float(np.abs(signature - self._last_signature).mean())
+                if self.last_score < self.threshold:
+                    self.skipped += 1
+                    return False
+
+            self._last_signature = signature
+            self._last_time = timestamp
+            self.passed += 1
+            return True
+
+    def reset(self):
+        """Forget the reference frame, the next check passes."""
+        with self._lock:
+            self._last_signature = None
+
+    def stats(self):
+        return {
+            'checked': self.checked,
+            'passed': self.passed,
+            'skipped': self.skipped,
+            'skip_rate': self.skipped / self.checked if self.checked else 0.0,
+            'last_score': self.last_score,
+        }
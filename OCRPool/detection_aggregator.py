@@ -0,0 +1,119 @@
+import collections
+
+
+class DetectionEvent:
+    """One appearance of a letter, confirmed over several OCR results."""
+
+    __slots__ = ('text', 'confidence', 'votes', 'frame', 'seq', 'timestamp', 'bbox')
+
+    def __init__(self, text, confidence, votes, frame, bbox):
+        self.text = text
+        self.confidence = confidence  # best single confidence among the votes
+        self.votes = votes
+        self.frame = frame  # the VideoFrame of the newest sighting, a reference into the frame ring (not a copy)
+        self.seq = frame.seq
+        self.timestamp = frame.timestamp
+        self.bbox = bbox  # where the letter is in that frame
+
+    def __repr__(self):
+        return "DetectionEvent(%r, %.2f, votes=%d, seq=%d)" % (self.text, self.confidence, self.votes, self.seq)
+
+
+class DetectionAggregator:
+    """
+    Turns the stream of OCR results into one event per letter appearance.
+
+    The last `window` OCRResults are kept. A letter is confirmed once it was read with at
+    least `min_confidence` in `min_votes` of them and its decayed score (confidences summed,
+    each multiplied by `decay` per result of age) reaches `min_score`. A confirmed letter
+    emits a single event and stays quiet until it has been missing from `rearm_after`
+    consecutive results, or until rearm(), e.g. when its event couldn't be acted on; only
+    then can it trigger again.
+    """
+
+    def __init__(self, window=8, min_votes=3, min_confidence=0.8, min_score=2.0, decay=0.85, rearm_after=6,
+                 letters=None):
+        self.window = window
+        self.min_votes = min_votes
+        self.min_confidence = min_confidence
+        self.min_score = min_score
+        self.decay = decay
+        self.rearm_after = rearm_after
+        self.letters = letters  # only these texts are considered (None: any)
+
+        # per result: {text: (confidence, bbox, frame)} of its best sighting of each letter
+        self._history = collections.deque(maxlen=window)
+        self._active = {}  # confirmed letter -> results in a row it has been missing from
+
+        self.results = 0
+        self.events = 0
+        self.suppressed = 0  # sightings of letters that had already triggered
+
+    def add(self, result):
+        """Feed one OCRResult, returns the DetectionEvents it confirmed (usually none)."""
+        self.results += 1
+        sightings = {}
+        for bbox, text, confidence in result.results:
+            text = text.strip().upper()
+            if self.letters is not None and text not in self.letters:
+                continue
+            if confidence >= self.min_confidence and confidence > sightings.get(text, (0.0,))[0]:
+                sightings[text] = (confidence, bbox, result.frame)
+        self._history.append(sightings)
+
+        for text in list(self._active):
+            if text in sightings:
+                self._active[text] = 0
+                self.suppressed += 1
+            else:
+                self._active[text] += 1
+                if self._active[text] >= self.rearm_after:
+                    del self._active[text]  # gone, the next appearance triggers again
+
+        events = []
+        for text in sightings:
+            if text in self._active:
+                continue
+            event = self._confirm(text)
+            if event is not None:
+                self._active[text] = 0
+                self.events += 1
+                events.append(event)
+        return events
+
+    def rearm(self, text):
+        """Let an already confirmed letter trigger again at its next sighting."""
+        self._active.pop(text, None)
+
+    def reset(self):
+        self._history.clear()
+        self._active.clear()
+
+    def stats(self):
+        return {
+            'results': self.results,
+            'events': self.events,
+            'suppressed': self.suppressed,
+            'active': sorted(self._active),
+        }
+
+    def _confirm(self, text):
+        votes = 0
+        score = 0.0
+        best = 0.0
+        newest = None
+        weight = 1.0
+        for sightings in reversed(self._history):  # newest first
+            if text in sightings:
+                confidence = sightings[text][0]
+                votes += 1
+                score += confidence * weight
+                best = max(best, confidence)
+                if newest is None:
+                    newest = sightings[text]
+            weight *= self.decay
+
+        if votes < self.min_votes or score < self.min_score:
+            return None
+        _, bbox, frame = newest
+        return DetectionEvent(text, best, votes, frame, bbox)
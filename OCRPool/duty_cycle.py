@@ -0,0 +1,85 @@
+import threading
+import time
+
+GROUNDED = 'grounded'
+SEARCHING = 'searching'
+ACTION = 'action'
+LANDING = 'landing'
+
+# OCR runs per second allowed in each flight phase (None: every frame, 0: paused)
+DEFAULT_RATES = {
+    GROUNDED: 1.0,  # only keeps the display and logs alive, nothing is acted on
+    SEARCHING: None,
+    ACTION: 0,  # detections are ignored while an action runs
+    LANDING: 0,
+}
+
+
+class DutyCycleGovernor:
+    """
+    Throttles OCR by flight phase (grounded, searching, action, landing).
+
+    allow() is asked once per frame and says whether that frame may go to OCR, given the
+    rate of the current phase. Wall time and CPU time (time.process_time, the whole process,
+    OCR threads included) are accounted to the phase they were spent in, so the savings of
+    the throttled phases show up in stats().
+    """
+
+    def __init__(self, rates=None, phase=GROUNDED):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self._lock = threading.Lock()
+        self.phase = phase
+        self._entered_wall = time.monotonic()
+        self._entered_cpu = time.process_time()
+        self._last_allowed = None
+
+        self._wall = {name: 0.0 for name in self.rates}
+        self._cpu = {name: 0.0 for name in self.rates}
+        self._allowed = {name: 0 for name in self.rates}
+        self._skipped = {name: 0 for name in self.rates}
+
+    def set_phase(self, phase):
+        if phase not in self.rates:
+            raise Exception("ocr: unknown flight phase '%s'." % phase)
+        with self._lock:
+            if phase == self.phase:
+                return
+            self._account()
+            print("ocr: flight phase %s -> %s" % (self.phase, phase))
+            self.phase = phase
+            self._last_allowed = None
+
+    def allow(self, now=None):
+        """Whether a frame arriving now may be OCR'd."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            rate = self.rates[self.phase]
+            if rate is None or (rate > 0 and (self._last_allowed is None or now - self._last_allowed >= 1.0 / rate)):
+                self._last_allowed = now
+                self._allowed[self.phase] += 1
+                return True
+            self._skipped[self.phase] += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._account()
+            return {
+                'phase': self.phase,
+                'phases': {
+                    name: {
+                        'seconds': self._wall[name],
+                        'cpu_seconds': self._cpu[name],
+                        'cpu_load': self._cpu[name] / self._wall[name] if self._wall[name] else 0.0,
+                        'ocr_frames': self._allowed[name],
+                        'skipped_frames': self._skipped[name],
+                    } for name in self.rates
+                },
+            }
+
+    def _account(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        self._wall[self.phase] += wall - self._entered_wall
+        self._cpu[self.phase] += cpu - self._entered_cpu
+        self._entered_wall, self._entered_cpu = wall, cpu
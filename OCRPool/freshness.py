@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class FreshnessGate:
+    """
+    Keeps stale detections from triggering actions.
+
+    check() compares a DetectionEvent's capture timestamp (time.monotonic of its source
+    frame) with now: within `deadline` seconds it passes; older, it passes only if
+    `reconfirm(event)` says the letter is still in view, otherwise it is dropped.
+    action_started() records the glass-to-action latency, from the capture of the frame
+    to the moment the action is sent to the drone.
+    """
+
+    def __init__(self, deadline=0.5, reconfirm=None):
+        self.deadline = deadline
+        self.reconfirm = reconfirm
+        self._lock = threading.Lock()
+
+        self.fresh = 0
+        self.reconfirmed = 0
+        self.dropped = 0
+        self.latencies = []
+
+    def check(self, event, now=None):
+        """:return: True if `event` may still trigger its action"""
+        age = (time.monotonic() if now is None else now) - event.timestamp
+        with self._lock:
+            if age <= self.deadline:
+                self.fresh += 1
+                return True
+        if self.reconfirm is not None and self.reconfirm(event):
+            with self._lock:
+                self.reconfirmed += 1
+            return True
+        with self._lock:
+            self.dropped += 1
+        print("ocr: dropped %s from frame %d, seen %.0f ms ago" % (event.text, event.seq, 1000 * age))
+        return False
+
+    def action_started(self, event, now=None):
+        """Record (and return) the glass-to-action latency of `event` in seconds."""
+        latency = (time.monotonic() if now is None else now) - event.timestamp
+        with self._lock:
+            self.latencies.append(latency)
+        return latency
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        return {
+            'fresh': self.fresh,
+            'reconfirmed': self.reconfirmed,
+            'dropped': self.dropped,
+            'actions': len(latencies),
+            'mean_latency_ms': 1000 * sum(latencies) / len(latencies) if latencies else None,
+            'max_latency_ms': 1000 * latencies[-1] if latencies else None,
+        }
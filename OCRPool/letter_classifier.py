@@ -0,0 +1,224 @@
+import numpy as np
+import cv2
+
+from .region_detector import RegionReader
+
+LETTERS = 'ABCDEFGH'
+# Negatives: the glyphs most likely to be confused with A-H, labelled as "not a letter we act on"
+OTHER_GLYPHS = 'IJKLMNOPQRSTUVWXYZ0123456789'
+FONTS = (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_DUPLEX,
+         cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX)
+REJECT = len(LETTERS)  # class id of the negatives
+SAMPLE_SIZE = 32
+CELL_SIZE = 8
+BINS = 9
+_CELLS = SAMPLE_SIZE // CELL_SIZE
+# Histogram slot of every pixel's cell, the orientation bin is added per image
+_CELL_INDEX = ((np.indices((SAMPLE_SIZE, SAMPLE_SIZE)) // CELL_SIZE) * [[[_CELLS]], [[1]]]).sum(axis=0) * BINS
+
+
+def normalize_glyph(gray):
+    """
+    Binarize a grayscale crop (Otsu, glyph white on black whatever its polarity), cut it to
+    the largest blob and centre it in a SAMPLE_SIZE square. Returns None if the crop is empty.
+    """
+    scale = 96.0 / max(gray.shape)
+    if scale < 1:
+        # Nothing below the final 32x32 needs the full resolution of a close-up crop
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # The background touches the border of the crop, the glyph mostly doesn't
+    border = np.concatenate((binary[0], binary[-1], binary[:, 0], binary[:, -1]))
+    if border.mean() > 127:
+        binary = cv2.bitwise_not(binary)
+
+    count, labels, blob_stats, _ = cv2.connectedComponentsWithStats(binary)
+    if count < 2:
+        return None
+    largest = 1 + int(np.argmax(blob_stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h = blob_stats[largest, :4]
+    glyph = binary[y:y + h, x:x + w]
+
+    side = max(w, h) + 4
+    square = np.zeros((side, side), dtype=np.uint8)
+    x0, y0 = (side - w) // 2, (side - h) // 2
+    square[y0:y0 + h, x0:x0 + w] = glyph
+    return cv2.resize(square, (SAMPLE_SIZE, SAMPLE_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def hog_features(glyph):
+    """
+    Histogram of oriented gradients of a SAMPLE_SIZE glyph: unsigned orientations in BINS
+    bins per CELL_SIZE cell, L2-normalized over overlapping 2x2 cell blocks.
+    (Plain numpy, cv2.HOGDescriptor is gone from the main OpenCV 5 package.)
+    """
+    image = glyph.astype(np.float32)
+    gx = cv2.Sobel(image, cv2.CV_32F, 1, 0, ksize=1)
+    gy = cv2.Sobel(image, cv2.CV_32F, 0, 1, ksize=1)
+    magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+    bins = ((angle % 180) * (BINS / 180.0)).astype(np.int32) % BINS
+
+    index = _CELL_INDEX + bins
+    histograms = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=_CELLS * _CELLS * BINS)
+    histograms = histograms.reshape(_CELLS, _CELLS, BINS)
+
+    blocks = np.concatenate([histograms[:-1, :-1], histograms[:-1, 1:], histograms[1:, :-1], histograms[1:, 1:]],
+                            axis=2)
+    blocks /= np.sqrt((blocks ** 2).sum(axis=2, keepdims=True)) + 1e-6
+    return blocks.ravel().astype(np.float32)
+
+
+class LetterClassifier:
+    """
+    HOG + k-nearest-neighbours classifier for the letters A-H on a single-glyph crop.
+
+    Trained when constructed (about 2 s) from glyphs rendered with the OpenCV
+    Hershey fonts, augmented with rotation, scale, shift, blur and noise, so nothing has to
+    be downloaded. Other letters and digits are trained as a reject class. classify()
+    returns (letter, confidence), with letter None for anything that is not A-H (the
+    confidence is then that of the rejection); the confidence combines the neighbour vote
+    with the distance to the training samples.
+    """
+
+    def __init__(self, k=5, augmentations=8, max_distance=None, seed=0):
+        self.k = k
+        self.samples, self.labels = self._render_training_set(augmentations, np.random.default_rng(seed))
+        self._sample_norms = (self.samples ** 2).sum(axis=1)
+
+        if max_distance is None:
+            # Beyond this (squared) distance a crop is unlike anything seen in training
+            rng = np.random.default_rng(seed + 1)
+            probe = self.samples[rng.choice(len(self.samples), min(200, len(self.samples)), replace=False)]
+            nearest = np.sort(self._distances(probe), axis=1)[:, 1:k + 1]  # column 0 is the sample itself
+            max_distance = 4 * float(np.percentile(nearest, 95))
+        self.max_distance = max_distance
+
+    def classify(self, gray):
+        return self.classify_glyph(normalize_glyph(gray))
+
+    def classify_glyph(self, glyph):
+        """classify() for a crop already passed through normalize_glyph()."""
+        if glyph is None:
+            return None, 0.0
+        distances = self._distances(hog_features(glyph)[np.newaxis])[0]
+        nearest = np.argpartition(distances, self.k)[:self.k]
+        neighbours = self.labels[nearest]
+        label = int(np.bincount(neighbours).argmax())
+
+        votes = float(np.mean(neighbours == label))
+        closeness = max(0.0, 1.0 - float(distances[nearest][neighbours == label].mean()) / self.max_distance)
+        return (None if label == REJECT else LETTERS[label]), votes * closeness
+
+    def _distances(self, features):
+        """Squared euclidean distances between each row of `features` and every training sample."""
+        return np.maximum((features ** 2).sum(axis=1)[:, np.newaxis] + self._sample_norms
+                          - 2 * features @ self.samples.T, 0)
+
+    def _render_training_set(self, augmentations, rng):
+        samples, labels = [], []
+        for label, glyphs in [(i, letter) for i, letter in enumerate(LETTERS)] + [(REJECT, OTHER_GLYPHS)]:
+            for glyph in glyphs:
+                for font in FONTS:
+                    for thickness in (2, 4, 7):
+                        image = self._render(glyph, font, thickness)
+                        for i in range(augmentations):
+                            sample = normalize_glyph(self._augment(image, rng) if i else image)
+                            if sample is not None:
+                                samples.append(hog_features(sample))
+                                labels.append(label)
+        return np.array(samples, dtype=np.float32), np.array(labels, dtype=np.int64)
+
+    @staticmethod
+    def _render(glyph, font, thickness):
+        (w, h), baseline = cv2.getTextSize(glyph, font, 2, thickness)
+        image = np.full((h + baseline + 30, w + 30), 255, dtype=np.uint8)
+        cv2.putText(image, glyph, (15, h + 15), font, 2, 0, thickness, cv2.LINE_AA)
+        return image
+
+    @staticmethod
+    def _augment(image, rng):
+        h, w = image.shape
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-12, 12), rng.uniform(0.8, 1.2))
+        matrix[:, 2] += rng.uniform(-4, 4, 2)
+        # Mild perspective-like shear, the drone rarely faces the card head on
+        matrix[0, 1] += rng.uniform(-0.15, 0.15)
+        image = cv2.warpAffine(image, matrix, (w, h), borderValue=255)
+        if rng.random() < 0.5:
+            image = cv2.GaussianBlur(image, (5, 5), rng.uniform(0.5, 1.5))
+        noise = rng.standard_normal(image.shape, dtype=np.float32) * rng.uniform(0, 20)
+        return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+class LetterReader(RegionReader):
+    """
+    RegionReader with a LetterClassifier fast path: regions classified with at least
+    `min_confidence` are answered directly, only the others go to EasyOCR's recognizer,
+    restricted to `allowlist`. Regions confidently rejected (another letter or a digit) are
+    not sent to EasyOCR at all, the allowlist would force them to read as one of A-H.
+    With a ResultCache, a region whose normalized glyph hashes like a recently read one reuses
+    that reading instead of being classified or recognized again.
+    readtext() keeps the easyocr.Reader.readtext format.
+    """
+
+    def __init__(self, reader, detector=None, classifier=None, min_confidence=0.85, allowlist=LETTERS, cache=None):
+        super().__init__(reader, detector, allowlist=allowlist)
+        self.classifier = classifier or LetterClassifier()
+        self.min_confidence = min_confidence
+        self.cache = cache
+
+        self.classified = 0
+        self.recognized = 0
+
+    def readtext(self, image):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        regions = self.detector.detect(image)
+        if not regions:
+            self.fallback_calls += 1
+            return self.reader.readtext(image, **self.recognize_options)
+
+        self.region_calls += 1
+        results = []
+        uncertain = []
+        uncertain_keys = []
+        for x, y, w, h in regions:
+            glyph = normalize_glyph(image[y:y + h, x:x + w])
+            if glyph is None:
+                # Nothing the classifier can look at: EasyOCR decides, as for any uncertain region
+                uncertain.append([x, x + w, y, y + h])
+                uncertain_keys.append(None)
+                continue
+            key = None
+            if self.cache is not None:
+                key = self.cache.key(glyph)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    letter, confidence = cached
+                    if letter:
+                        results.append(([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], letter, confidence))
+                    continue
+
+            letter, confidence = self.classifier.classify_glyph(glyph)
+            if confidence >= self.min_confidence:
+                self.classified += 1
+                if key is not None:
+                    self.cache.put(key, (letter, confidence))
+                if letter is None:
+                    continue
+                results.append(([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], letter, confidence))
+            else:
+                uncertain.append([x, x + w, y, y + h])
+                uncertain_keys.append(key)
+
+        if uncertain:
+            self.recognized += len(uncertain)
+            recognized = self.reader.recognize(np.ascontiguousarray(image), horizontal_list=uncertain, free_list=[],
+                                               **self.recognize_options)
+            results += recognized
+            if self.cache is not None:
+                # Results come back with the box they were asked for, unread boxes are cached as nothing
+                read = {(bbox[0][0], bbox[0][1]): (text, confidence) for bbox, text, confidence in recognized}
+                for (x_min, _, y_min, _), key in zip(uncertain, uncertain_keys):
+                    if key is not None:
+                        self.cache.put(key, read.get((x_min, y_min), (None, 0.0)))
+        return results
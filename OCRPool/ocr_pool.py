@@ -0,0 +1,273 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import numpy as np
+import cv2
+
+from .letter_classifier import LetterReader
+from .region_detector import RegionReader
+from .result_cache import ResultCache
+
+
+def create_reader(warmup=True):
+    """
+    Default reader factory: an English EasyOCR reader, warmed up. Top-level so worker processes
+    can pickle it. easyocr (and torch) are only imported here, the first time a reader is needed.
+    """
+    import easyocr
+
+    reader = easyocr.Reader(['en'])
+    if warmup:
+        warm_up(reader)
+    return reader
+
+
+def warm_up(reader):
+    """One throwaway readtext, so the first real frame doesn't pay for the lazy initialisation of the models."""
+    image = np.full((120, 320), 255, dtype=np.uint8)
+    cv2.putText(image, 'ABC', (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 2.5, 0, 6)
+    reader.readtext(image)
+
+
+def create_region_reader():
+    """English EasyOCR reader that only recognizes the glyph regions found by a RegionDetector."""
+    return RegionReader(create_reader())
+
+
+def create_letter_reader():
+    """Reader for the A-H cards: built-in classifier first, EasyOCR (restricted to A-H) when it is unsure."""
+    return LetterReader(create_reader(), cache=ResultCache())
+
+
+class OCRResult:
+    """The text found in one frame, tagged with the frame it came from."""
+
+    __slots__ = ('frame', 'seq', 'timestamp', 'results', 'duration', 'worker')
+
+    def __init__(self, frame, results, duration, worker):
+        self.frame = frame  # the source VideoFrame
+        self.seq = frame.seq
+        self.timestamp = frame.timestamp  # capture time of the source frame
+        self.results = results  # [(bbox, text, confidence), ...] as returned by readtext
+        self.duration = duration  # seconds spent in readtext
+        self.worker = worker
+
+
+def _process_worker(conn, reader_factory, threads):
+    """Entry point of a worker process: loads a reader, then OCRs every image it is sent."""
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+    try:
+        reader = reader_factory()
+    except Exception as exc:
+        conn.send(('error', repr(exc)))
+        return
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            image = conn.recv()
+        except EOFError:
+            return
+        if image is None:
+            return
+        try:
+            conn.send(('ok', reader.readtext(image)))
+        except Exception as exc:
+            conn.send(('error', repr(exc)))
+
+
+class OCRPool:
+    """
+    Pool of OCR workers with latest-frame-wins scheduling.
+
+    Every worker holds its own reader. submit() replaces the frame waiting to be read, so
+    a worker that becomes free always picks up the newest frame and older ones are dropped.
+    Results are published in `results` (also see get_results()) with the sequence number
+    and capture timestamp of their source frame.
+
+    mode='thread' runs the readers in threads of this process (PyTorch releases the GIL while
+    it computes); mode='process' gives each reader its own process and `threads_per_worker`
+    torch threads, which scales with the number of cores.
+
+    With a ChangeGate as `gate`, a worker first checks the frame it picked up against the
+    last one that was OCR'd and skips it if the scene has not changed.
+    """
+
+    def __init__(self, workers=1, mode='thread', reader_factory=create_reader, threads_per_worker=None,
+                 gate=None):
+        if mode not in ('thread', 'process'):
+            raise Exception("ocr: unknown pool mode '%s'." % mode)
+        self.workers = workers
+        self.mode = mode
+        self.reader_factory = reader_factory
+        self.threads_per_worker = threads_per_worker
+        self.gate = gate
+
+        self.results = queue.Queue()
+        self.running = False
+
+        self._pending = None  # (frame, image) waiting for a free worker
+        self._job_ready = threading.Condition()
+        self._ready = threading.Semaphore(0)
+        self._threads = []
+        self._processes = []
+        self._conns = []
+
+        self.submitted = 0
+        self.dropped = 0  # replaced by a newer frame before any worker got to them
+        self.completed = 0
+        self.busy_time = 0.0
+        self.load_times = []  # seconds from start() until each worker's reader was ready
+        self.load_failures = 0  # workers whose reader could not be loaded
+        self._started_at = None
+
+    def start(self):
+        """Start the workers; their readers load in the background (see wait_ready())."""
+        if self.running:
+            return
+        self.running = True
+        self._started_at = time.monotonic()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_thread, args=(index,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until every worker has tried to load its reader. Returns False on timeout, or if
+        any of them failed to (see load_failures).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in range(self.workers):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self._ready.acquire(timeout=remaining):
+                return False
+        # Give the permits back so the pool can be waited on again
+        for _ in range(self.workers):
+            self._ready.release()
+        return self.load_failures == 0
+
+    def stop(self):
+        with self._job_ready:
+            self.running = False
+            self._pending = None
+            self._job_ready.notify_all()
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(1.0)
+
+    def submit(self, frame, image):
+        """Queue `image` (taken from VideoFrame `frame`) for OCR, replacing the frame still waiting."""
+        with self._job_ready:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (frame, image)
+            self.submitted += 1
+            self._job_ready.notify()
+
+    def get_results(self):
+        """All results published since the last call, without blocking."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self._started_at, 1e-6) if self._started_at else 0.0
+        mean_duration = self.busy_time / self.completed if self.completed else 0.0
+        stats = {
+            'workers': self.workers,
+            'mode': self.mode,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'completed': self.completed,
+            'results_per_second': self.completed / elapsed if elapsed else 0.0,
+            'mean_duration': mean_duration,
+            'load_seconds': max(self.load_times, default=None),
+            'load_failures': self.load_failures,
+        }
+        if self.gate is not None:
+            stats['gate'] = self.gate.stats()
+            # OCR time the skipped frames would have cost
+            stats['saved_seconds'] = self.gate.skipped * mean_duration
+        return stats
+
+    def _take_job(self):
+        with self._job_ready:
+            self._job_ready.wait_for(lambda: self._pending is not None or not self.running)
+            job = self._pending
+            self._pending = None
+            return job
+
+    def _start_reader(self):
+        """Load a reader for the calling worker thread, returns the function that runs it."""
+        if self.mode == 'thread':
+            return self.reader_factory().readtext
+
+        context = multiprocessing.get_context('spawn')
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_process_worker,
+                                  args=(child_conn, self.reader_factory, self.threads_per_worker))
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        self._processes.append(process)
+        self._conns.append(conn)
+        status, value = conn.recv()
+        if status != 'ready':
+            raise Exception(value)
+
+        def readtext(image):
+            conn.send(image)
+            status, value = conn.recv()
+            if status != 'ok':
+                raise Exception(value)
+            return value
+
+        return readtext
+
+    def _worker_thread(self, index):
+        try:
+            readtext = self._start_reader()
+        except Exception as exc:
+            print("ocr: worker %d could not load a reader: %s" % (index, exc))
+            with self._job_ready:
+                self.load_failures += 1
+            return
+        finally:
+            self._ready.release()
+        self.load_times.append(time.monotonic() - self._started_at)
+        print("ocr: worker %d ready after %.1f s" % (index, self.load_times[-1]))
+
+        while True:
+            job = self._take_job()
+            if job is None:
+                return
+            frame, image = job
+            if self.gate is not None and not self.gate.check(image, frame.timestamp):
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = readtext(image)
+            except Exception as exc:
+                print("ocr: worker %d failed: %s" % (index, exc))
+                continue
+            duration = time.perf_counter() - started
+
+            with self._job_ready:
+                self.completed += 1
+                self.busy_time += duration
+            self.results.put(OCRResult(frame, results, duration, index))
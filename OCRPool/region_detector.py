@@ -0,0 +1,108 @@
+import numpy as np
+import cv2
+
+
+class RegionDetector:
+    """
+    Proposes the few regions of a grayscale image that look like a single large glyph.
+
+    Adaptive threshold + contours, no learned model: a contour is a candidate when its box
+    covers between `min_area` and `max_area` of the image, has a letter-like aspect ratio
+    and is not itself a (card) rectangle. Candidates lying inside a larger one (the holes of
+    an 'A' or 'B', the inner edge of a stroke) are dropped. Returns at most `max_regions`
+    boxes as (x, y, w, h), largest first, padded by `padding` of their size because the
+    recognizer reads better with a margin around the glyph.
+    """
+
+    def __init__(self, min_area=0.0005, max_area=0.25, aspect_range=(0.3, 1.5), max_regions=6,
+                 padding=0.15, block_size=31, c=10):
+        self.min_area = min_area
+        self.max_area = max_area
+        self.aspect_range = aspect_range  # width / height
+        self.max_regions = max_regions
+        self.padding = padding
+        self.block_size = block_size
+        self.c = c
+
+    def detect(self, gray):
+        height, width = gray.shape[:2]
+        image_area = float(width * height)
+
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV,
+                                       self.block_size, self.c)
+        contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+        candidates = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            area = w * h
+            if not self.min_area <= area / image_area <= self.max_area:
+                continue
+            if not self.aspect_range[0] <= w / h <= self.aspect_range[1]:
+                continue
+            if self._is_rectangle(contour, area):
+                continue
+            candidates.append((x, y, w, h))
+
+        candidates.sort(key=lambda box: box[2] * box[3], reverse=True)
+        regions = []
+        for box in candidates:
+            if any(self._inside(box, kept) for kept in regions):
+                continue
+            regions.append(box)
+            if len(regions) == self.max_regions:
+                break
+        return [self._pad(box, width, height) for box in regions]
+
+    @staticmethod
+    def _is_rectangle(contour, box_area):
+        perimeter = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+        return len(approx) == 4 and cv2.contourArea(contour) > 0.9 * box_area
+
+    @staticmethod
+    def _inside(box, outer, ratio=0.9):
+        x, y, w, h = box
+        ox, oy, ow, oh = outer
+        overlap_w = min(x + w, ox + ow) - max(x, ox)
+        overlap_h = min(y + h, oy + oh) - max(y, oy)
+        if overlap_w <= 0 or overlap_h <= 0:
+            return False
+        return overlap_w * overlap_h >= ratio * w * h
+
+    def _pad(self, box, width, height):
+        x, y, w, h = box
+        pad = int(max(w, h) * self.padding)
+        x0, y0 = max(x - pad, 0), max(y - pad, 0)
+        x1, y1 = min(x + w + pad, width), min(y + h + pad, height)
+        return x0, y0, x1 - x0, y1 - y0
+
+
+class RegionReader:
+    """
+    Wraps an EasyOCR reader: readtext() only recognizes the regions found by a
+    RegionDetector, skipping EasyOCR's CRAFT text detector, and falls back to the full
+    readtext when no region is found. Same result format as easyocr.Reader.readtext.
+    """
+
+    def __init__(self, reader, detector=None, **recognize_options):
+        self.reader = reader
+        self.detector = detector or RegionDetector()
+        self.recognize_options = recognize_options  # e.g. allowlist
+
+        self.region_calls = 0
+        self.fallback_calls = 0
+
+    def readtext(self, image):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        regions = self.detector.detect(image)
+        if not regions:
+            self.fallback_calls += 1
+            return self.reader.readtext(image, **self.recognize_options)
+
+        self.region_calls += 1
+        # EasyOCR boxes are [x_min, x_max, y_min, y_max]
+        horizontal_list = [[x, x + w, y, y + h] for x, y, w, h in regions]
+        return self.reader.recognize(np.ascontiguousarray(image), horizontal_list=horizontal_list, free_list=[],
+                                     **self.recognize_options)
@@ -0,0 +1,83 @@
+import collections
+import threading
+import time
+
+import numpy as np
+import cv2
+
+
+def dhash(gray, size=8):
+    """
+    Difference hash of a grayscale crop: the crop is reduced to (size + 1) x size pixels and
+    every bit tells whether a pixel is brighter than its right neighbour. Insensitive to
+    scale, brightness and contrast; hash normalized glyphs (see normalize_glyph) so that
+    flat background, where noise would decide the bits, is already uniform.
+    """
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of recognition results, keyed by the dhash of the crop.
+
+    Entries expire `ttl` seconds after they were stored (a card seen again later is read
+    again), and the least recently used one is evicted beyond `max_size`. Shared by the
+    workers of a pool, hence the lock.
+    """
+
+    def __init__(self, max_size=256, ttl=2.0, hash_size=8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hash_size = hash_size
+
+        self._entries = collections.OrderedDict()  # key -> (stored at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, gray):
+        return dhash(gray, self.hash_size)
+
+    def get(self, key):
+        """The cached value for `key`, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
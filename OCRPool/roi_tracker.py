@@ -0,0 +1,203 @@
+import threading
+
+import numpy as np
+import cv2
+
+
+def bbox_to_rect(bbox):
+    """EasyOCR's 4-point box -> (x, y, w, h)."""
+    xs = [point[0] for point in bbox]
+    ys = [point[1] for point in bbox]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+class Track:
+    """A confirmed letter followed from frame to frame. `rect` is (x, y, w, h) in OCR image pixels."""
+
+    __slots__ = ('text', 'confidence', 'rect', 'points', 'frame', 'age', 'misses')
+
+    def __init__(self, text, confidence, rect, points, frame):
+        self.text = text
+        self.confidence = confidence  # from the last successful recognition
+        self.rect = rect
+        self.points = points
+        # The VideoFrame `points` were found or followed in. Held, not just its image, so a
+        # shared-ring slot stays pinned while it is the reference
+        self.frame = frame
+        self.age = 0  # frames since the last recognition
+        self.misses = 0  # failed re-recognitions in a row
+
+    def __repr__(self):
+        return "Track(%r, rect=%s)" % (self.text, tuple(int(v) for v in self.rect))
+
+
+class ROITracker:
+    """
+    Follows the boxes of confirmed detections at stream rate with pyramidal Lucas-Kanade
+    optical flow on the OCR image of each VideoFrame (the decoder's downscaled grayscale copy,
+    `frame.small`).
+
+    Features inside each box are tracked with a forward-backward check, the box moves by
+    their median displacement and scales with their spread. Every `recheck_every` frames the
+    tracked ROI alone goes through `recognize(crop) -> (text, confidence)`; the track is
+    dropped after `max_misses` failed re-recognitions in a row, or when too few features
+    survive. While something is tracked, wants_full_scan() lets a full-frame OCR through only
+    every `full_scan_every` frames, so new letters are still found. last_seen() can be asked
+    from other threads.
+    """
+
+    def __init__(self, recognize, recheck_every=10, full_scan_every=15, min_confidence=0.6, max_misses=2,
+                 min_points=6, max_points=40):
+        self.recognize = recognize
+        self.recheck_every = recheck_every
+        self.full_scan_every = full_scan_every
+        self.min_confidence = min_confidence
+        self.max_misses = max_misses
+        self.min_points = min_points
+        self.max_points = max_points
+
+        self.tracks = []
+        self._since_full_scan = 0
+        self._lock = threading.Lock()  # tracks, replaced by start/update/reset, are also read by last_seen
+
+        self.tracked_frames = 0
+        self.rechecks = 0
+        self.lost = 0
+        self.full_scans = 0
+        self.skipped_scans = 0
+
+    def start(self, text, confidence, bbox, frame):
+        """
+        Track the letter `text` found at `bbox` (EasyOCR's 4 points) in `frame`. The frame can
+        be a few frames old (OCR latency), the next update() catches up from there.
+        """
+        rect = bbox_to_rect(bbox)
+        points = self._features(frame.small, rect)
+        with self._lock:
+            self.tracks = [track for track in self.tracks if track.text != text]
+            if points is None:
+                return None
+            track = Track(text, confidence, rect, points, frame)
+            self.tracks.append(track)
+        return track
+
+    def update(self, frame):
+        """Move every track to `frame`. Returns the tracks still alive."""
+        if not self.tracks:
+            return self.tracks
+
+        image = frame.small
+        alive = []
+        with self._lock:
+            for track in self.tracks:
+                if self._follow(track, frame) and self._recheck(track, image):
+                    alive.append(track)
+                else:
+                    self.lost += 1
+            self.tracks = alive
+        self.tracked_frames += 1
+        return alive
+
+    def last_seen(self, text):
+        """Capture timestamp of the newest frame the letter `text` was followed in, None if it isn't tracked."""
+        with self._lock:
+            for track in self.tracks:
+                if track.text == text:
+                    return track.frame.timestamp
+        return None
+
+    def wants_full_scan(self):
+        """Whether the current frame should also get a full-frame OCR run."""
+        self._since_full_scan += 1
+        if self.tracks and self._since_full_scan < self.full_scan_every:
+            self.skipped_scans += 1
+            return False
+        self._since_full_scan = 0
+        self.full_scans += 1
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
+
+    def stats(self):
+        with self._lock:
+            tracks = [track.text for track in self.tracks]
+        return {
+            'tracks': tracks,
+            'tracked_frames': self.tracked_frames,
+            'rechecks': self.rechecks,
+            'lost': self.lost,
+            'full_scans': self.full_scans,
+            'skipped_scans': self.skipped_scans,
+        }
+
+    def _features(self, image, rect):
+        x, y, w, h = (int(round(v)) for v in rect)
+        mask = np.zeros(image.shape[:2], dtype=np.uint8)
+        mask[max(y, 0):y + h, max(x, 0):x + w] = 255
+        points = cv2.goodFeaturesToTrack(image, self.max_points, 0.01, 3, mask=mask)
+        if points is None or len(points) < self.min_points:
+            return None
+        return points.astype(np.float32)
+
+    def _follow(self, track, frame):
+        previous, image = track.frame.small, frame.small
+        if previous.shape != image.shape:
+            # The OCR scale changed, bring the reference frame and the box to the new one
+            factor = image.shape[1] / previous.shape[1]
+            previous = cv2.resize(previous, (image.shape[1], image.shape[0]), interpolation=cv2.INTER_LINEAR)
+            track.points = track.points * factor
+            track.rect = tuple(v * factor for v in track.rect)
+        points, status, _ = cv2.calcOpticalFlowPyrLK(previous, image, track.points, None,
+                                                     winSize=(15, 15), maxLevel=3)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(image, previous, points, None,
+                                                        winSize=(15, 15), maxLevel=3)
+        good = ((status[:, 0] == 1) & (back_status[:, 0] == 1)
+                & (np.linalg.norm((back - track.points)[:, 0], axis=1) < 1.0))
+        if good.sum() < self.min_points:
+            return False
+
+        old, new = track.points[good, 0], points[good, 0]
+        shift = np.median(new - old, axis=0)
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        scale = float(np.median(new_spread[old_spread > 1] / old_spread[old_spread > 1])) if (old_spread > 1).any() \
+            else 1.0
+
+        x, y, w, h = track.rect
+        cx, cy = x + w / 2 + shift[0], y + h / 2 + shift[1]
+        w, h = w * scale, h * scale
+        track.rect = (cx - w / 2, cy - h / 2, w, h)
+        track.points = new.reshape(-1, 1, 2)
+        track.frame = frame
+
+        height, width = image.shape[:2]
+        # Lost once the card is mostly out of the picture
+        return cx >= 0 and cy >= 0 and cx < width and cy < height
+
+    def _recheck(self, track, image):
+        track.age += 1
+        if track.age < self.recheck_every:
+            return True
+        track.age = 0
+        self.rechecks += 1
+
+        height, width = image.shape[:2]
+        x, y, w, h = track.rect
+        x0, y0 = max(int(x), 0), max(int(y), 0)
+        x1, y1 = min(int(x + w), width), min(int(y + h), height)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return False
+
+        text, confidence = self.recognize(image[y0:y1, x0:x1])
+        if text == track.text and confidence >= self.min_confidence:
+            track.confidence = confidence
+            track.misses = 0
+            # Fresh features, the old ones drift and thin out
+            points = self._features(image, track.rect)
+            if points is not None:
+                track.points = points
+            return True
+        track.misses += 1
+        return track.misses < self.max_misses
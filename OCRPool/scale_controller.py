@@ -0,0 +1,100 @@
+import time
+
+
+class ScaleController:
+    """
+    Picks the OCR input scale (percent of the decoded frame) from a small pyramid of `levels`.
+
+    It starts at the smallest level and goes one level up when an OCR run found nothing, or
+    only something with a marginal confidence (below `confident`), as long as the expected
+    latency of the next level stays within `budget` seconds. It steps down when the current
+    level exceeds the budget, after `relax_after` confident results in a row (to see if a
+    cheaper level still reads the card), and back to the bottom after `idle_after` empty
+    results at the top (nothing to read, no point paying for the big image).
+
+    Latencies are tracked per level as an exponential moving average.
+    """
+
+    def __init__(self, levels=(30, 40, 50, 65, 80), budget=0.15, confident=0.8, marginal=0.3, relax_after=10,
+                 idle_after=5, smoothing=0.3):
+        self.levels = levels
+        self.budget = budget
+        self.confident = confident
+        self.marginal = marginal  # below this a reading counts as nothing found
+        self.relax_after = relax_after
+        self.idle_after = idle_after
+        self.smoothing = smoothing
+
+        self.level = 0
+        self._confident_in_row = 0
+        self._empty_in_row = 0
+        self._latency = [None] * len(levels)
+        self._runs = [0] * len(levels)
+        self._hits = [0] * len(levels)
+        self.changes = 0
+        self.changed_at = time.monotonic()
+
+    @property
+    def scale_percent(self):
+        return self.levels[self.level]
+
+    def observe(self, scale_percent, duration, confidences):
+        """
+        Feed back one OCR run made at `scale_percent` that took `duration` seconds and read
+        texts with `confidences`. Returns the scale to use from now on.
+        """
+        if scale_percent not in self.levels:
+            return self.scale_percent
+        index = self.levels.index(scale_percent)
+        latency = self._latency[index]
+        self._latency[index] = duration if latency is None else latency + self.smoothing * (duration - latency)
+        self._runs[index] += 1
+        best = max(confidences, default=0.0)
+        if best >= self.confident:
+            self._hits[index] += 1
+
+        if index != self.level:
+            return self.scale_percent  # a run still in flight from before the last change
+
+        if self._latency[index] > self.budget and self.level > 0:
+            self._set_level(self.level - 1)
+        elif best >= self.confident:
+            self._empty_in_row = 0
+            self._confident_in_row += 1
+            if self._confident_in_row >= self.relax_after and self.level > 0:
+                self._set_level(self.level - 1)
+        elif self.level + 1 < len(self.levels) and self._expected_latency(self.level + 1) <= self.budget:
+            # Marginal or nothing: look closer
+            self._set_level(self.level + 1)
+        elif best < self.marginal:
+            self._empty_in_row += 1
+            if self._empty_in_row >= self.idle_after:
+                self._set_level(0)
+        return self.scale_percent
+
+    def stats(self):
+        return {
+            'scale_percent': self.scale_percent,
+            'changes': self.changes,
+            'levels': {
+                level: {
+                    'latency_ms': None if self._latency[i] is None else 1000 * self._latency[i],
+                    'runs': self._runs[i],
+                    'hit_rate': self._hits[i] / self._runs[i] if self._runs[i] else 0.0,
+                } for i, level in enumerate(self.levels)
+            },
+        }
+
+    def _expected_latency(self, index):
+        if self._latency[index] is not None:
+            return self._latency[index]
+        current = self._latency[self.level] or 0.0
+        # OCR cost grows with the pixel count
+        return current * (self.levels[index] / self.levels[self.level]) ** 2
+
+    def _set_level(self, index):
+        self.level = index
+        self._confident_in_row = 0
+        self._empty_in_row = 0
+        self.changes += 1
+        self.changed_at = time.monotonic()
@@ -0,0 +1,165 @@
+import socket
+import threading
+import time
+
+from djitellopy import Tello
+
+# djitellopy's receive thread calls the class attribute Tello.parse_state, it is wrapped once for the
+# whole process while any Telemetry with source='djitellopy' runs, and every one of them gets the states
+_listeners = []
+_listeners_lock = threading.Lock()
+_original_parse_state = None
+
+
+def _parse_state(state):
+    parsed = _original_parse_state(state)
+    if parsed:
+        for telemetry in list(_listeners):
+            telemetry.publish(parsed)
+    return parsed
+
+
+def _listen(telemetry):
+    global _original_parse_state
+    with _listeners_lock:
+        if not _listeners:
+            _original_parse_state = Tello.parse_state
+            Tello.parse_state = staticmethod(_parse_state)
+        _listeners.append(telemetry)
+
+
+def _unlisten(telemetry):
+    with _listeners_lock:
+        if telemetry not in _listeners:
+            return
+        _listeners.remove(telemetry)
+        if not _listeners:
+            Tello.parse_state = staticmethod(_original_parse_state)
+
+
+class TelemetrySnapshot:
+    """One state packet of the Tello, parsed. Never modified once published."""
+
+    __slots__ = ('seq', 'timestamp', 'height', 'tof', 'battery', 'pitch', 'roll', 'yaw', 'vgx', 'vgy', 'vgz',
+                 'agx', 'agy', 'agz', 'baro', 'templ', 'temph', 'flight_time')
+
+    def __init__(self, seq, timestamp, state):
+        self.seq = seq
+        self.timestamp = timestamp  # time.monotonic() at reception
+        self.height = state.get('h')  # cm, relative to the takeoff point
+        self.tof = state.get('tof')  # cm, time-of-flight distance to the ground
+        self.battery = state.get('bat')  # %
+        self.pitch = state.get('pitch')  # degrees
+        self.roll = state.get('roll')
+        self.yaw = state.get('yaw')
+        self.vgx = state.get('vgx')  # dm/s
+        self.vgy = state.get('vgy')
+        self.vgz = state.get('vgz')
+        self.agx = state.get('agx')  # 0.001 g
+        self.agy = state.get('agy')
+        self.agz = state.get('agz')
+        self.baro = state.get('baro')  # m
+        self.templ = state.get('templ')  # °C
+        self.temph = state.get('temph')
+        self.flight_time = state.get('time')  # s, motors on
+
+    def __repr__(self):
+        return "TelemetrySnapshot(seq=%d, height=%s, battery=%s)" % (self.seq, self.height, self.battery)
+
+
+class Telemetry:
+    """
+    Push-based cache of the Tello state stream (UDP 8890, ~10 packets/s).
+
+    Every packet is parsed once into a TelemetrySnapshot and published by replacing
+    `snapshot` (a single reference assignment, so readers never lock and never see a half
+    written state); the last `history` snapshots are kept in a ring. Readers (HeightGuard,
+    key handlers) get the values in microseconds without sending anything to the drone.
+
+    source='djitellopy' (default) taps the state djitellopy already receives: the first
+    Tello() owns port 8890, so the packets are taken from Tello.parse_state instead of a
+    second socket. source='socket' listens on `state_port` itself, for use without djitellopy.
+    """
+
+    def __init__(self, history=64, source='djitellopy', state_ip='0.0.0.0', state_port=8890):
+        if source not in ('djitellopy', 'socket'):
+            raise Exception("telemetry: unknown source '%s'." % source)
+        self.source = source
+        self.state_ip = state_ip
+        self.state_port = state_port
+
+        self.capacity = history
+        self._ring = [None] * history
+        self.seq = 0
+        self.snapshot = None  # the newest TelemetrySnapshot, None until the first packet
+
+        self.running = False
+        self._socket = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        if self.source == 'djitellopy':
+            _listen(self)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.bind((self.state_ip, self.state_port))
+            thread = threading.Thread(target=self._receive_state)
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        _unlisten(self)
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def publish(self, state):
+        """Store a parsed state dict (djitellopy's format) as the newest snapshot. Single writer."""
+        seq = self.seq + 1
+        snapshot = TelemetrySnapshot(seq, time.monotonic(), state)
+        self._ring[seq % self.capacity] = snapshot
+        self.seq = seq
+        self.snapshot = snapshot
+        return snapshot
+
+    @property
+    def height(self):
+        snapshot = self.snapshot
+        return None if snapshot is None else snapshot.height
+
+    @property
+    def battery(self):
+        snapshot = self.snapshot
+        return None if snapshot is None else snapshot.battery
+
+    def age(self):
+        """Seconds since the newest snapshot (None before the first one)."""
+        snapshot = self.snapshot
+        return None if snapshot is None else time.monotonic() - snapshot.timestamp
+
+    def history(self, n=None):
+        """The `n` newest snapshots (all the ring holds by default), oldest first."""
+        newest = self.seq
+        count = min(n or self.capacity, self.capacity, newest)
+        snapshots = []
+        for seq in range(newest - count + 1, newest + 1):
+            snapshot = self._ring[seq % self.capacity]
+            if snapshot is not None and snapshot.seq == seq:  # not overwritten while we were reading
+                snapshots.append(snapshot)
+        return snapshots
+
+    def _receive_state(self):
+        while self.running:
+            try:
+                data, _ = self._socket.recvfrom(1024)
+            except OSError:
+                break  # closed by stop()
+            try:
+                state = Tello.parse_state(data.decode('ASCII'))
+            except UnicodeDecodeError:
+                continue
+            if state:
+                self.publish(state)
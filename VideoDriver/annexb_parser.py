@@ -0,0 +1,171 @@
+from .packet_buffer import PacketBuffer
+
+# H.264 NAL unit types (ITU-T H.264, table 7-1) the video pipeline cares about
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+VCL_TYPES = (NAL_SLICE, NAL_IDR)
+# Non-VCL NAL units that may only appear before the first slice of a picture (7.4.1.2.3)
+AU_PREFIX_TYPES = (NAL_SEI, NAL_SPS, NAL_PPS, NAL_AUD, 14, 15, 16, 17, 18)
+
+START_CODE = b'\x00\x00\x01'
+
+
+class AccessUnit:
+    """One coded picture (plus the parameter sets/SEI sent with it) from the Annex-B stream."""
+
+    __slots__ = ('data', 'nal_types', 'nal_offsets', 'timestamp', 'offset')
+
+    def __init__(self, data, nal_types, nal_offsets=(), timestamp=None, offset=None):
+        self.data = data  # bytes, starting with a start code
+        self.nal_types = nal_types  # tuple of the NAL unit types, in stream order
+        self.nal_offsets = nal_offsets  # offset of each NAL header byte in data
+        self.timestamp = timestamp  # arrival time of the first packet (time.monotonic)
+        self.offset = offset  # position of data[0] in the whole stream received so far
+
+    def nal(self, index, size=None):
+        """Bytes of the `index`-th NAL unit, starting at its header (only the first `size` bytes if given)."""
+        start = self.nal_offsets[index]
+        if index + 1 < len(self.nal_offsets):
+            end = self.nal_offsets[index + 1] - 3  # the next start code
+        else:
+            end = len(self.data)
+        if size is not None:
+            end = min(end, start + size)
+        return self.data[start:end]
+
+    @property
+    def is_keyframe(self):
+        return NAL_IDR in self.nal_types
+
+    @property
+    def has_parameter_sets(self):
+        return NAL_SPS in self.nal_types or NAL_PPS in self.nal_types
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return 'AccessUnit(%d bytes, nal_types=%r)' % (len(self.data), self.nal_types)
+
+
+class AnnexBParser:
+    """
+    Streaming splitter of an H.264 Annex-B byte stream into access units.
+
+    Data is appended to a PacketBuffer (either directly by the receiver or through
+    feed()), and parse() scans only the bytes that arrived since the previous call.
+    An access unit is complete once the first NAL unit of the next one is seen, using
+    the rules of H.264 7.4.1.2.3: an AUD/SPS/PPS/SEI after a slice, or a slice with
+    first_mb_in_slice == 0.
+    """
+
+    def __init__(self, buffer=None):
+        self.buffer = PacketBuffer() if buffer is None else buffer
+
+        self._scan = 0  # where the next start code search begins
+        self._consumed = 0  # stream bytes handed out or dropped, before the start of the buffer
+        self._unit_start = None  # offset of the pending access unit, None until its first start code
+        self._unit_types = []
+        self._unit_offsets = []
+        self._unit_has_slice = False
+        self._unit_timestamp = None
+
+    def feed(self, data, timestamp=None):
+        """Append `data` to the buffer and return the access units it completed."""
+        self.buffer.write(data)
+        return self.parse(timestamp)
+
+    def parse(self, timestamp=None):
+        """
+        Scan the newly buffered bytes.
+
+        :param timestamp: arrival time of the new bytes, stored on the access units they start
+
+        :return: a list of the completed AccessUnit
+        """
+        data = self.buffer.data
+        end = self.buffer.length
+        units = []
+
+        pos = self._scan
+        while True:
+            code = data.find(START_CODE, pos, end)
+            # The NAL header and the first byte of the slice header are needed to find a boundary
+            if code < 0 or code + 4 >= end:
+                # Keep the last bytes, a start code may continue in the next packet
+                self._scan = code if code >= 0 else max(pos, end - 2)
+                break
+
+            header = code + 3
+            start = code - 1 if code > 0 and data[code - 1] == 0 else code  # 4 byte start code
+            nal_type = data[header] & 0x1F
+
+            if self._unit_has_slice and self._starts_unit(nal_type, data[header + 1]):
+                units.append(self._take_unit(start))
+
+            if self._unit_start is None:
+                self._unit_start = start
+                self._unit_timestamp = timestamp
+            self._unit_types.append(nal_type)
+            self._unit_offsets.append(header - self._unit_start)
+            if nal_type in VCL_TYPES:
+                self._unit_has_slice = True
+
+            pos = header + 1
+
+        self._compact()
+        return units
+
+    def flush(self):
+        """Return the pending access unit even though the next one has not started (e.g. stream stopped)."""
+        if not self._unit_has_slice:
+            return None
+        unit = self._take_unit(self.buffer.length)
+        self._consumed += self.buffer.length
+        self.buffer.reset()
+        self._scan = 0
+        return unit
+
+    def reset(self):
+        """Drop everything buffered, e.g. after packet loss."""
+        self._consumed += self.buffer.length
+        self.buffer.reset()
+        self._scan = 0
+        self._unit_start = None
+        self._unit_types = []
+        self._unit_offsets = []
+        self._unit_has_slice = False
+        self._unit_timestamp = None
+
+    @staticmethod
+    def _starts_unit(nal_type, first_slice_byte):
+        if nal_type in VCL_TYPES:
+            # first_mb_in_slice is ue(v) coded, a leading 1 bit means 0 (first slice of a picture)
+            return bool(first_slice_byte & 0x80)
+        return nal_type in AU_PREFIX_TYPES
+
+    def _take_unit(self, end):
+        unit = AccessUnit(self.buffer.tobytes(self._unit_start, end), tuple(self._unit_types),
+                          tuple(self._unit_offsets), self._unit_timestamp, self._consumed + self._unit_start)
+        self._unit_start = None
+        self._unit_types = []
+        self._unit_offsets = []
+        self._unit_has_slice = False
+        self._unit_timestamp = None
+        return unit
+
+    def _compact(self):
+        # Everything before the pending access unit (or the scan position) has been handed out
+        drop = self._scan if self._unit_start is None else self._unit_start
+        if drop <= 0:
+            return
+        self.buffer.consume(drop)
+        self._consumed += drop
+        self._scan -= drop
+        if self._unit_start is not None:
+            self._unit_start -= drop
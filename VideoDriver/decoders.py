@@ -0,0 +1,144 @@
+import numpy as np
+import cv2
+
+from .video_frame import VideoFrame
+
+
+class DecoderBackend:
+    """
+    Interface of the H.264 decoders the VideoDriver can use.
+
+    decode() gets exactly one access unit and returns the VideoFrame objects it produced,
+    with the representation for `output_mode` ('bgr' or 'gray') already built.
+    """
+
+    name = None
+
+    def __init__(self, output_mode='bgr'):
+        self.output_mode = output_mode
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class H264DecoderBackend(DecoderBackend):
+    """The DaWelter/h264decoder extension (the Windows wheel in requirements.txt). Outputs RGB only."""
+
+    name = 'h264decoder'
+
+    def __init__(self, output_mode='bgr'):
+        super().__init__(output_mode)
+        import h264decoder
+
+        h264decoder.disable_logging()  # Supress decoder messages
+        self.decoder = h264decoder.H264Decoder()
+
+    def decode(self, data):
+        res_frame_list = []
+        frames = self.decoder.decode(data)
+        for frame_data in frames:
+            (frame, w, h, ls) = frame_data
+            if frame is not None:
+                # Straight from the README example at:
+                # https://github.com/DaWelter/h264decoder/tree/master?tab=readme-ov-file#examples
+
+                # View on the decoder's buffer, no copy
+                frame = np.frombuffer(frame, dtype=np.ubyte, count=len(frame))
+                frame = (frame.reshape((h, ls // 3, 3)))
+                rgb = frame[:, :w, :]
+                # At this point `rgb` references your usual height x width x RGB channels numpy array
+                # of unsigned bytes.
+
+                res_frame_list.append(self._make_frame(rgb))
+
+        return res_frame_list
+
+    def _make_frame(self, rgb):
+        """Wrap a decoded RGB image, converting only what the output mode needs right now."""
+        def to_bgr():
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+        def to_i420():
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420)
+
+        if self.output_mode == 'gray':
+            # The decoder only hands out RGB, so this is one conversion instead of RGB -> BGR -> GRAY
+            return VideoFrame(gray=cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY), make_bgr=to_bgr, make_i420=to_i420)
+
+        bgr = to_bgr()
+        return VideoFrame(bgr=bgr, make_gray=lambda: cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY), make_i420=to_i420)
+
+
+class PyAVDecoderBackend(DecoderBackend):
+    """
+    libavcodec through PyAV, available on Linux/macOS/Windows wheels.
+
+    Frames come out as YUV 4:2:0, so the gray output is a zero-copy view on the Y plane.
+    `threads` = 0 lets libavcodec pick; note that frame threading delays output by up to
+    `threads` frames, use thread_type='SLICE' when latency matters more than throughput.
+    """
+
+    name = 'pyav'
+
+    def __init__(self, output_mode='bgr', threads=0, thread_type='AUTO'):
+        super().__init__(output_mode)
+        import av
+
+        self._av = av
+        self.codec = av.CodecContext.create('h264', 'r')
+        self.codec.thread_count = threads
+        self.codec.thread_type = thread_type
+
+    def decode(self, data):
+        # The access unit is already complete, no need for the codec parser (which would hold it back a frame)
+        packet = self._av.Packet(data)
+        return [self._make_frame(frame) for frame in self.codec.decode(packet)]
+
+    def _make_frame(self, frame):
+        def to_bgr():
+            return frame.to_ndarray(format='bgr24')
+
+        if frame.format.name not in ('yuv420p', 'yuvj420p'):
+            bgr = to_bgr()
+            return VideoFrame(bgr=bgr, make_gray=lambda: cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY))
+
+        def to_gray():
+            plane = frame.planes[0]
+            luma = np.frombuffer(plane, dtype=np.ubyte).reshape((plane.height, plane.line_size))
+            return luma[:, :plane.width]
+
+        def to_i420():
+            # Planes packed one after the other, (height * 3/2) x width
+            return frame.to_ndarray()
+
+        if self.output_mode == 'gray':
+            return VideoFrame(gray=to_gray(), make_bgr=to_bgr, make_i420=to_i420)
+        return VideoFrame(bgr=to_bgr(), make_gray=to_gray, make_i420=to_i420)
+
+
+BACKENDS = {
+    H264DecoderBackend.name: H264DecoderBackend,
+    PyAVDecoderBackend.name: PyAVDecoderBackend,
+}
+
+
+def create_decoder(backend='auto', output_mode='bgr', **options):
+    """
+    Create a decoder backend by name ('h264decoder', 'pyav' or 'auto').
+
+    'auto' keeps the original h264decoder when it is installed and falls back to PyAV.
+    """
+    if backend == 'auto':
+        for name in (H264DecoderBackend.name, PyAVDecoderBackend.name):
+            try:
+                return BACKENDS[name](output_mode, **options)
+            except ImportError:
+                continue
+        raise Exception("driver: no H.264 decoder installed (h264decoder or av).")
+
+    if backend not in BACKENDS:
+        raise Exception("driver: unknown decoder backend '%s'." % backend)
+    return BACKENDS[backend](output_mode, **options)
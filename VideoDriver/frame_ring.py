@@ -0,0 +1,84 @@
+import threading
+
+
+class FrameRing:
+    """
+    Fixed-size ring of the most recently decoded frames.
+
+    The receive thread is the only writer. Each pushed VideoFrame gets a monotonic sequence
+    number (starting at 1) and its capture timestamp, and readers get references to the
+    stored frames, never copies. Slots are checked against their sequence number, so a
+    reader racing with the writer skips a slot that was just reused instead of returning the
+    wrong frame. Consumers can block in wait() until a newer frame is pushed.
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.seq = 0  # sequence number of the newest frame, 0 while empty
+        self._slots = [None] * capacity
+        self._new_frame = threading.Condition()
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def push(self, frame, timestamp):
+        """Store `frame`, captured at `timestamp` (time.monotonic), and return its sequence number."""
+        seq = self.seq + 1
+        frame.seq = seq
+        frame.timestamp = timestamp
+        self._slots[seq % self.capacity] = frame
+        with self._new_frame:
+            self.seq = seq  # published only once the slot holds the frame
+            self._new_frame.notify_all()
+        return seq
+
+    def wait(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than `after_seq` exists.
+
+        :return: the newest frame, or None if `timeout` seconds passed without one
+        """
+        with self._new_frame:
+            if not self._new_frame.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+        return self.latest()
+
+    def get(self, seq):
+        """The frame with sequence number `seq`, or None if it is not in the ring (anymore)."""
+        if seq <= 0 or seq > self.seq:
+            return None
+        frame = self._slots[seq % self.capacity]
+        if frame is None or frame.seq != seq:
+            return None
+        return frame
+
+    def latest(self):
+        """The newest frame, or None before the first one."""
+        while True:
+            seq = self.seq
+            if seq == 0:
+                return None
+            frame = self._slots[seq % self.capacity]
+            if frame is not None and frame.seq == seq:
+                return frame
+            # The writer went a whole lap around the ring since `seq` was read, take the new newest
+
+    def since(self, seq):
+        """Frames newer than `seq` that are still in the ring, oldest first."""
+        newest = self.seq
+        first = max(seq + 1, newest - self.capacity + 1, 1)
+        return self._collect(first, newest)
+
+    def last(self, n):
+        """The `n` newest frames (fewer if the ring holds less), oldest first."""
+        newest = self.seq
+        first = max(newest - min(n, self.capacity) + 1, 1)
+        return self._collect(first, newest)
+
+    def _collect(self, first, newest):
+        frames = []
+        for seq in range(first, newest + 1):
+            frame = self.get(seq)
+            if frame is not None:
+                frames.append(frame)
+        return frames
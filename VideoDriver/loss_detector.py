@@ -0,0 +1,232 @@
+import collections
+
+from .annexb_parser import NAL_IDR, NAL_SPS, VCL_TYPES
+
+# profile_idc values whose SPS carries the chroma/bit depth fields (H.264 7.3.2.1.1)
+HIGH_PROFILES = (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135)
+
+# The Tello sends every picture in datagrams of this size, the last one shorter
+TELLO_DATAGRAM = 1460
+
+
+class _BitReader:
+    """Minimal MSB-first bit reader for the Exp-Golomb coded headers."""
+
+    def __init__(self, data):
+        # Undo emulation prevention (00 00 03 -> 00 00), good enough for the first header bytes
+        self.data = data.replace(b'\x00\x00\x03', b'\x00\x00')
+        self.pos = 0
+
+    def u(self, bits):
+        value = 0
+        for _ in range(bits):
+            byte = self.data[self.pos >> 3]  # IndexError when the header is truncated
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def ue(self):
+        zeros = 0
+        while self.u(1) == 0:
+            zeros += 1
+            if zeros > 31:
+                raise ValueError("invalid Exp-Golomb code")
+        return (1 << zeros) - 1 + self.u(zeros)
+
+
+class LossDetector:
+    """
+    Detects packet loss in the Tello video stream and decides what gets decoded.
+
+    Loss is signalled by:
+        - the kernel dropping datagrams (receiver kernel drop counter going up)
+        - a gap in the slice header frame_num of consecutive reference pictures
+        - a NAL header with the forbidden_zero_bit set
+        - the decoder raising an error
+        - the datagrams of an access unit (see observe_datagrams()): the Tello starts every
+          picture in a new datagram and ends it with one shorter than `datagram_size`. A unit
+          that ends on a full datagram followed by a pause longer than `burst_gap` seconds
+          lost its last datagram; one whose bytes aren't exactly those of whole datagrams
+          lost a datagram across a boundary. Only checked once a unit showed that pattern, so
+          other senders aren't flagged. A full datagram lost from the middle of a picture
+          leaves no such trace, only the decoder can notice it.
+
+    After a loss every access unit is skipped until one carrying an IDR picture or a
+    SPS arrives, instead of feeding the decoder a broken reference chain.
+    """
+
+    def __init__(self, datagram_size=TELLO_DATAGRAM, burst_gap=0.01):
+        self.datagram_size = datagram_size
+        self.burst_gap = burst_gap  # the datagrams of one picture come closer together than this
+        self.resyncing = True  # nothing can be decoded before the first keyframe anyway
+
+        self.losses = 0
+        self.resyncs = 0
+        self.skipped_units = 0
+        self.decoder_errors = 0
+        self.causes = {'kernel_drop': 0, 'frame_num_gap': 0, 'bad_nal': 0, 'decoder_error': 0, 'short_unit': 0,
+                       'byte_count': 0}
+
+        self._kernel_drops = 0
+        self._log2_max_frame_num = None  # from the SPS, None if it could not be parsed
+        self._separate_colour_plane = False
+        self._prev_ref_frame_num = None
+        self._datagrams = collections.deque()  # (stream offset, size, gap before it) of the received datagrams
+        self._stream_bytes = 0
+        self._packetized = False  # a unit was seen in whole datagrams ending on a short one
+
+    def observe_datagrams(self, datagrams):
+        """Feed the (size, seconds since the previous one) of each received datagram, in order."""
+        for size, gap in datagrams:
+            self._datagrams.append((self._stream_bytes, size, gap))
+            self._stream_bytes += size
+
+    def observe_kernel_drops(self, count):
+        """
+        Feed the receiver's cumulative kernel drop counter (None if not available).
+
+        :return: True if datagrams were dropped since the previous call
+        """
+        if count is not None and count > self._kernel_drops:
+            self._kernel_drops = count
+            self._lost('kernel_drop')
+            return True
+        return False
+
+    def observe_decoder_error(self):
+        self.decoder_errors += 1
+        self._lost('decoder_error')
+
+    def accept(self, unit):
+        """
+        Check an access unit before it is decoded.
+
+        :return: True if it should be decoded, False to skip it
+        """
+        cause = self._check_datagrams(unit)
+        if cause is not None:
+            self._lost(cause)
+            self.skipped_units += 1
+            return False
+
+        for index, nal_type in enumerate(unit.nal_types):
+            if unit.data[unit.nal_offsets[index]] & 0x80:
+                self._lost('bad_nal')
+                self.skipped_units += 1
+                return False
+            if nal_type == NAL_SPS:
+                self._parse_sps(unit.nal(index, 32))
+
+        if self.resyncing:
+            if not (unit.is_keyframe or NAL_SPS in unit.nal_types):
+                self.skipped_units += 1
+                return False
+            self.resyncing = False
+            self.resyncs += 1
+
+        if not self._check_frame_num(unit):
+            self._lost('frame_num_gap')
+            self.skipped_units += 1
+            return False
+        return True
+
+    def stats(self):
+        return {
+            'losses': self.losses,
+            'resyncs': self.resyncs,
+            'resyncing': self.resyncing,
+            'skipped_units': self.skipped_units,
+            'decoder_errors': self.decoder_errors,
+            'causes': dict(self.causes),
+        }
+
+    def _lost(self, cause):
+        self.causes[cause] += 1
+        if not self.resyncing:
+            # Count a burst as one loss, until the stream is back in sync
+            self.losses += 1
+            self.resyncing = True
+        self._prev_ref_frame_num = None
+
+    def _check_datagrams(self, unit):
+        """The loss cause the datagrams of `unit` show, None if they look complete (or aren't known)."""
+        if unit.offset is None or not self._datagrams:
+            return None
+        start, end = unit.offset, unit.offset + len(unit.data)
+        datagrams = self._datagrams
+        while datagrams and datagrams[0][0] + datagrams[0][1] <= start:
+            datagrams.popleft()  # before this unit
+        if not datagrams or datagrams[0][0] >= end:
+            return None
+
+        count = 0
+        while count < len(datagrams) and datagrams[count][0] < end:
+            count += 1
+        first_offset = datagrams[0][0]
+        last_offset, last_size, _ = datagrams[count - 1]
+        whole = first_offset == start and last_offset + last_size == end
+        if not self._packetized:
+            self._packetized = whole and last_size < self.datagram_size
+            return None
+        if not whole:
+            return 'byte_count'
+        if last_size >= self.datagram_size and count < len(datagrams) and datagrams[count][2] > self.burst_gap:
+            return 'short_unit'
+        return None
+
+    def _parse_sps(self, nal):
+        try:
+            bits = _BitReader(nal[1:])
+            profile_idc = bits.u(8)
+            bits.u(16)  # constraint flags, level_idc
+            bits.ue()  # seq_parameter_set_id
+            separate_colour_plane = False
+            if profile_idc in HIGH_PROFILES:
+                if bits.ue() == 3:  # chroma_format_idc
+                    separate_colour_plane = bool(bits.u(1))
+                bits.ue()  # bit_depth_luma_minus8
+                bits.ue()  # bit_depth_chroma_minus8
+                bits.u(1)  # qpprime_y_zero_transform_bypass_flag
+                if bits.u(1):
+                    # Scaling matrices are not worth parsing here, just stop checking frame_num
+                    self._log2_max_frame_num = None
+                    return
+            self._log2_max_frame_num = bits.ue() + 4
+            self._separate_colour_plane = separate_colour_plane
+        except (IndexError, ValueError):
+            self._log2_max_frame_num = None
+
+    def _check_frame_num(self, unit):
+        """Return False if frame_num shows that pictures were lost before `unit`."""
+        if self._log2_max_frame_num is None:
+            return True
+
+        for index, nal_type in enumerate(unit.nal_types):
+            if nal_type in VCL_TYPES:
+                break
+        else:
+            return True
+
+        nal = unit.nal(index, 16)
+        try:
+            bits = _BitReader(nal[1:])
+            bits.ue()  # first_mb_in_slice
+            bits.ue()  # slice_type
+            bits.ue()  # pic_parameter_set_id
+            if self._separate_colour_plane:
+                bits.u(2)
+            frame_num = bits.u(self._log2_max_frame_num)
+        except (IndexError, ValueError):
+            return True
+
+        is_reference = bool(nal[0] & 0x60)  # nal_ref_idc
+        expected = self._prev_ref_frame_num
+        if nal_type == NAL_IDR or expected is None:
+            in_sequence = True
+        else:
+            max_frame_num = 1 << self._log2_max_frame_num
+            in_sequence = frame_num in (expected, (expected + 1) % max_frame_num)
+
+        if in_sequence and is_reference:
+            self._prev_ref_frame_num = frame_num
+        return in_sequence
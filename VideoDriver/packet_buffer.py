@@ -0,0 +1,96 @@
+class PacketBuffer:
+    """
+    Growable receive buffer for the raw h264 stream.
+
+    Datagrams are received straight into a preallocated bytearray through a memoryview,
+    so appending a packet never re-copies the data that is already buffered. The buffer
+    only grows (by doubling) when a frame is larger than anything seen before.
+    """
+
+    def __init__(self, capacity=256 * 1024, max_datagram=2048):
+        self.max_datagram = max_datagram
+        self.length = 0  # number of valid bytes at the start of the buffer
+
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def data(self):
+        """The underlying bytearray. Only the first `length` bytes are valid."""
+        return self._data
+
+    def reserve(self, size):
+        """Make sure at least `size` more bytes fit after the valid data."""
+        needed = self.length + size
+        if needed <= len(self._data):
+            return
+
+        capacity = len(self._data) * 2
+        while capacity < needed:
+            capacity *= 2
+
+        # A bytearray cannot be resized while a memoryview is exported, so move to a new one
+        data = bytearray(capacity)
+        data[:self.length] = self._view[:self.length]
+        self._view.release()
+        self._data = data
+        self._view = memoryview(data)
+
+    def tail(self, size=None):
+        """Writable view of the free space after the valid data (`size` bytes, reserved first)."""
+        size = self.max_datagram if size is None else size
+        self.reserve(size)
+        return self._view[self.length:self.length + size]
+
+    def commit(self, size):
+        """Mark `size` bytes written through `tail()` as valid."""
+        self.length += size
+
+    def recv_into(self, sock):
+        """
+        Receive one datagram from `sock` directly into the buffer.
+
+        :return: the size of the datagram
+        """
+        size = sock.recv_into(self.tail())
+        self.length += size
+        return size
+
+    def recvmsg_into(self, sock, ancbufsize):
+        """
+        Like recv_into(), but also returns the ancillary data of the datagram.
+
+        :return: (size, ancdata)
+        """
+        size, ancdata, _, _ = sock.recvmsg_into([self.tail()], ancbufsize)
+        self.length += size
+        return size, ancdata
+
+    def write(self, data):
+        """Append `data` (anything supporting the buffer protocol) to the buffer."""
+        size = len(data)
+        self.tail(size)[:] = data
+        self.length += size
+
+    def view(self, start=0, end=None):
+        """Zero-copy view of the valid data."""
+        end = self.length if end is None else end
+        return self._view[start:end]
+
+    def tobytes(self, start=0, end=None):
+        """Copy of the valid data as an immutable bytes object (what the decoders expect)."""
+        return self.view(start, end).tobytes()
+
+    def consume(self, size):
+        """Drop the first `size` bytes, moving whatever is left to the front of the buffer."""
+        remaining = self.length - size
+        if remaining > 0:
+            self._view[:remaining] = self._view[size:self.length]
+        self.length = max(remaining, 0)
+
+    def reset(self):
+        """Forget the buffered data, keeping the allocation."""
+        self.length = 0
@@ -0,0 +1,156 @@
+import multiprocessing
+import struct
+import threading
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+import cv2
+
+from .video_frame import VideoFrame
+
+# seq, timestamp, width, height, corrupted, small width, small height
+SLOT_HEADER = struct.Struct('=QdIIIII')
+HEADER_SIZE = 64  # keeps the image data of every slot aligned
+
+
+class SharedFrameRing:
+    """
+    Ring of decoded frames in shared memory, written by the decoder process and read by the driver.
+
+    Each slot holds a header, the frame as planar YUV 4:2:0 (the Y plane is the grayscale
+    image) and the optional downscaled grayscale copy. The reader hands out VideoFrame
+    objects whose images are views on the slot, so nothing is copied between processes.
+
+    A slot stays pinned while any VideoFrame made from it is alive; the writer skips pinned
+    slots (and drops the frame if all of them are pinned), so a frame never changes under
+    a consumer that still holds it. Pin counts are written by the reader only.
+
+    `lock` is shared by both processes (the owner creates it, the other side gets it with the
+    name): the writer picks a free slot and invalidates its header under it, the reader pins a
+    slot and checks its header under it. Without it a reader could pin and validate a slot the
+    writer had just found free, and be handed pixels that are being overwritten.
+    """
+
+    def __init__(self, capacity=12, max_width=960, max_height=720, name=None, lock=None):
+        self.capacity = capacity
+        self.max_width = max_width
+        self.max_height = max_height
+
+        self._image_size = max_width * max_height * 3 // 2
+        self._small_size = max_width * max_height
+        self._slot_size = HEADER_SIZE + self._image_size + self._small_size
+        self._slots_offset = HEADER_SIZE * ((4 * capacity + HEADER_SIZE - 1) // HEADER_SIZE)
+
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=self._slots_offset + capacity * self._slot_size)
+        self.name = self.shm.name
+        self.lock = multiprocessing.get_context('spawn').Lock() if lock is None else lock
+        self._pins = np.ndarray((capacity,), dtype=np.uint32, buffer=self.shm.buf)
+        if self.owner:
+            self._pins[:] = 0
+
+        # Writer side
+        self._next_slot = 0
+        self.written = 0
+        self.dropped = 0
+
+        # Reader side
+        self._pin_lock = threading.Lock()
+
+    def close(self):
+        self._pins = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # frames still hold views on the memory, it is released with them
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+    def stats(self):
+        return {'written': self.written, 'dropped_all_pinned': self.dropped, 'capacity': self.capacity}
+
+    def write(self, frame, seq, timestamp):
+        """
+        Copy `frame` into the next free slot.
+
+        :return: the slot number, or None if the frame was dropped (too big, or every slot pinned)
+        """
+        height, width = frame.shape
+        if width > self.max_width or height > self.max_height:
+            print("driver: frame %dx%d does not fit the shared ring" % (width, height))
+            self.dropped += 1
+            return None
+
+        buf = self.shm.buf
+        with self.lock:
+            slot = self._find_free_slot()
+            if slot is None:
+                self.dropped += 1
+                return None
+            base = self._slots_offset + slot * self._slot_size
+            # Invalidate the slot while it is being written, before any reader can pin it again
+            SLOT_HEADER.pack_into(buf, base, 0, 0.0, 0, 0, 0, 0, 0)
+
+        image = np.ndarray((height * 3 // 2, width), dtype=np.uint8, buffer=buf, offset=base + HEADER_SIZE)
+        image[:] = frame.i420
+
+        small_height, small_width = (0, 0)
+        if frame.small is not None:
+            small_height, small_width = frame.small.shape
+            small = np.ndarray((small_height, small_width), dtype=np.uint8, buffer=buf,
+                               offset=base + HEADER_SIZE + self._image_size)
+            small[:] = frame.small
+
+        SLOT_HEADER.pack_into(buf, base, seq, timestamp, width, height, int(frame.corrupted),
+                              small_width, small_height)
+        self.written += 1
+        return slot
+
+    def read(self, slot, seq):
+        """
+        Make a VideoFrame on top of `slot`, which the writer announced as holding frame `seq`.
+
+        :return: the frame (pinning the slot while it is alive), or None if the slot was reused
+        """
+        base = self._slots_offset + slot * self._slot_size
+        buf = self.shm.buf
+        with self.lock:
+            # Pinned before the writer can pick the slot, or seen invalidated
+            self._pin(slot)
+            slot_seq, timestamp, width, height, corrupted, small_width, small_height = \
+                SLOT_HEADER.unpack_from(buf, base)
+            if slot_seq != seq:
+                self._unpin(slot)
+                return None
+
+        image = np.ndarray((height * 3 // 2, width), dtype=np.uint8, buffer=buf, offset=base + HEADER_SIZE)
+        small = None
+        if small_width:
+            small = np.ndarray((small_height, small_width), dtype=np.uint8, buffer=buf,
+                               offset=base + HEADER_SIZE + self._image_size)
+
+        frame = VideoFrame(gray=image[:height], small=small, corrupted=bool(corrupted),
+                           make_bgr=lambda: cv2.cvtColor(image, cv2.COLOR_YUV2BGR_I420),
+                           make_i420=lambda: image)
+        weakref.finalize(frame, self._unpin, slot)
+        return frame
+
+    def _find_free_slot(self):
+        for i in range(self.capacity):
+            slot = (self._next_slot + i) % self.capacity
+            if self._pins[slot] == 0:
+                self._next_slot = (slot + 1) % self.capacity
+                return slot
+        return None
+
+    def _pin(self, slot):
+        with self._pin_lock:
+            self._pins[slot] += 1
+
+    def _unpin(self, slot):
+        with self._pin_lock:
+            if self._pins is not None:
+                self._pins[slot] -= 1
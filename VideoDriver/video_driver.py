@@ -1,15 +1,15 @@
 from djitellopy import Tello
-import h264decoder
 import logging
-import time
+import multiprocessing
 import threading
-import socket
-import numpy as np
-import cv2
 
-# Disable logging for the decoder and tello python driver
+from CommandArbiter import Keepalive
+from .frame_ring import FrameRing
+from .shared_frame_ring import SharedFrameRing
+from .video_pipeline import VideoPipeline, run_pipeline_process
+
+# Disable logging for the tello python driver (decoder logging is handled by the backends)
 Tello.LOGGER.setLevel(logging.ERROR)  # Suppress djitellopy info logs
-h264decoder.disable_logging()         # Supress decoder messages
 
 '''
 [YES - Implemented]:                     stop(void) -> status<OK,FAIL>
@@ -22,34 +22,80 @@ h264decoder.disable_logging()         # Supress decoder messages
 
 
 class VideoDriver:
-    def __init__(self, config=Tello(), video_ip='0.0.0.0'):
-        self.drone = config
+    def __init__(self, config=None, video_ip='0.0.0.0', rcvbuf_size=4 * 1024 * 1024, batch_size=64,
+                 decode_during_resync=False, output_mode='bgr', scale_percent=None, decoder='auto', ring_size=8,
+                 process=False):
+        # Created here rather than as a default argument, so importing the package doesn't bind the Tello ports
+        self.drone = Tello() if config is None else config
         self.platform = "DRONE"  # For compatibility with other drivers
-        self.frame = None  # frame read from h264decoder
-        self.last_frame = None  # last frame when video is frozen
-
-        self.decoder = h264decoder.H264Decoder()
+        self.frames = FrameRing(ring_size)  # the last decoded VideoFrames, with sequence numbers
+        self.last_frame = None  # last VideoFrame when video is frozen
+
+        # 'bgr' or 'gray': what the decode stage produces and read() returns, the other one is made on demand
+        if output_mode not in ('bgr', 'gray'):
+            raise Exception("driver: unknown output mode '%s'." % output_mode)
+        self.output_mode = output_mode
+        self._scale_percent = scale_percent
         self.frozen = False
 
         self.video_port = 11111
 
-        self.socket_video = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # socket for receiving video stream
-        self.socket_video.bind((video_ip, self.video_port))
-
-        self.sending_command_thread = threading.Thread(target=self._send_keepalive)
-        self.sending_command_thread.daemon = True
-
-        self.receive_video_thread = threading.Thread(target=self._receive_video_thread)
+        pipeline_options = {
+            'video_ip': video_ip,
+            'video_port': self.video_port,
+            'rcvbuf_size': rcvbuf_size,
+            'batch_size': batch_size,
+            'decoder': decoder,  # 'h264decoder', 'pyav', 'auto' (or a DecoderBackend, thread mode only)
+            'output_mode': output_mode,
+            'scale_percent': scale_percent,
+            'decode_during_resync': decode_during_resync,
+        }
+
+        # Receive + decode either in a thread of this process, or in a child process that shares
+        # the decoded frames through shared memory (keeps its own core and GIL, whatever OCR is doing)
+        self.pipeline = None
+        self.decoder_process = None
+        self._process_stats = {}
+        if process:
+            # Spare slots for the frames consumers (OCR workers, queued actions...) still hold on top of the ring
+            self.shared_frames = SharedFrameRing(ring_size + 8)
+            context = multiprocessing.get_context('spawn')  # no forking of the Tello threads
+            frames_conn, child_frames_conn = context.Pipe(duplex=False)
+            child_control_conn, self._control_conn = context.Pipe(duplex=False)
+            self.decoder_process = context.Process(
+                target=run_pipeline_process,
+                args=(self.shared_frames.name, self.shared_frames.capacity, self.shared_frames.lock,
+                      child_frames_conn, child_control_conn, pipeline_options))
+            self.decoder_process.daemon = True
+            self.decoder_process.start()
+            child_frames_conn.close()
+            child_control_conn.close()
+            self._frames_conn = frames_conn
+
+            self.receive_video_thread = threading.Thread(target=self._receive_frames_thread)
+        else:
+            self.pipeline = VideoPipeline(self.frames.push, **pipeline_options)
+            self.receive_video_thread = threading.Thread(target=self.pipeline.run)
         self.receive_video_thread.daemon = True
 
-        self.sending_command_thread.start()
+        # Only sends something when no command was answered for a while (the drone lands after ~15 s)
+        self.keepalive = Keepalive(self.drone)
+
         self.receive_video_thread.start()
 
         self.initialized = False
 
     def __del__(self):
-        """Closes the local socket."""
-        self.socket_video.close()
+        """Closes the local socket (or stops the decoder process)."""
+        if self.pipeline is not None:
+            self.pipeline.close()
+        elif self.decoder_process is not None:
+            try:
+                self._control_conn.send(('stop',))
+            except OSError:
+                pass
+            self.decoder_process.join(1.0)
+            self.shared_frames.close()
         self.shutdown()
 
     def initialize(self):
@@ -59,6 +105,7 @@ class VideoDriver:
             # Connect to the drone and start video stream
             self.drone.connect()
             self.drone.streamon()
+            self.keepalive.start()
             self.initialized = True
             print("driver: initialized.")
 
@@ -70,6 +117,7 @@ class VideoDriver:
             print("driver: shutting down...")
 
             # Stop the video stream
+            self.keepalive.stop()
             self.drone.streamoff()
             self.initialized = False
 
@@ -80,18 +128,67 @@ class VideoDriver:
     def release(self):
         self.shutdown()
 
+    @property
+    def scale_percent(self):
+        """If set, the decode stage also makes a downscaled grayscale copy (VideoFrame.small)."""
+        return self._scale_percent
+
+    @scale_percent.setter
+    def scale_percent(self, value):
+        self._scale_percent = value
+        if self.pipeline is not None:
+            self.pipeline.scale_percent = value
+        else:
+            self._control_conn.send(('set', 'scale_percent', value))
+
+    @property
+    def latest_frame(self):
+        """The most recent VideoFrame read from the decoder."""
+        return self.frames.latest()
+
+    @property
+    def frame(self):
+        """The most recent frame as a BGR image (converted on first access in 'gray' mode)."""
+        frame = self.latest_frame
+        return None if frame is None else frame.bgr
+
     def read(self):
+        """Return the last frame from camera, as an image in the driver's output mode."""
+        ret, frame = self.read_frame()
+        if not ret:
+            return [0, 0]
+        if frame is None:
+            # Frozen before the first frame arrived
+            return [ret, None]
+        if self.output_mode == 'gray':
+            return [ret, frame.gray]
+        return [ret, frame.bgr]
+
+    def read_frame(self):
         if not self.initialized:
             raise Exception("driver: not initialized. Cannot render frame.")
-        """Return the last frame from camera."""
+        """Return the last VideoFrame from camera (status 3 if it was decoded from a damaged stream)."""
         if self.frozen:
             return [2, self.last_frame]
         else:
-            if self.frame is None:
+            frame = self.latest_frame
+            if frame is None:
                 # This is the standard way to indicate no frame available yet
                 return [0, 0]
+            if frame.corrupted:
+                return [3, frame]
             # Return the frame
-            return [1, self.frame]
+            return [1, frame]
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        if not self.initialized:
+            raise Exception("driver: not initialized. Cannot render frame.")
+        """
+        Sleep until a frame newer than `after_seq` has been decoded (ignores freezing).
+
+        :return: the newest VideoFrame, or None if nothing arrived within `timeout` seconds
+        """
+        return self.frames.wait(after_seq, timeout)
 
     def set_freeze(self, is_frozen=True):
         if not self.initialized:
@@ -100,67 +197,34 @@ class VideoDriver:
         self.frozen = is_frozen
         if is_frozen:
             print("driver: freezing camera")
-            self.last_frame = self.frame
+            self.last_frame = self.latest_frame
         else:
             print("driver: unfreezing camera")
 
-    def _receive_video_thread(self):
-        """
-        Listens for video streaming (raw h264) from the Tello.
-
-        Runs as a thread, sets self.frame to the most recent frame Tello captured.
-
-        """
-        packet_data = b""
-        while True:
-            try:
-                res_string, ip = self.socket_video.recvfrom(2048)
-                packet_data += res_string
-                # end of frame
-                if len(res_string) != 1460:
-                    for frame in self._h264_decode(packet_data):
-                        self.frame = frame
-                    packet_data = b""
-
-            except socket.error as exc:
-                print("Caught exception socket.error : %s" % exc)
-
-    def _h264_decode(self, packet_data):
-        """
-        decode raw h264 format data from Tello
-
-        :param packet_data: raw h264 data array
+    def get_stats(self):
+        """Return the counters of the video pipeline (as last reported, in process mode)."""
+        if self.pipeline is not None:
+            return self.pipeline.stats()
+        return dict(self._process_stats)
 
-        :return: a list of decoded frame
+    def _receive_frames_thread(self):
         """
-        res_frame_list = []
-        frames = self.decoder.decode(packet_data)
-        for frame_data in frames:
-            (frame, w, h, ls) = frame_data
-            if frame is not None:
-                # Straight from the README example at:
-                # https://github.com/DaWelter/h264decoder/tree/master?tab=readme-ov-file#examples
-
-                # print 'frame size %i bytes, w %i, h %i, line_size %i' % (len(frame), w, h, ls)
-
-                frame = np.fromstring(frame, dtype=np.ubyte, count=len(frame), sep='')
-                frame = (frame.reshape((h, ls // 3, 3)))
-                frame = frame[:, :w, :]
-                # At this point `frame` references your usual height x width x RGB channels numpy array
-                # of unsigned bytes.
-
-                # Convert from RGB to BGR
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                res_frame_list.append(frame)
+        Process mode: turns the decoder process's announcements into frames.
 
-        return res_frame_list
+        Runs as a thread, pushes views on the shared memory slots into self.frames.
 
-    def _send_keepalive(self):
         """
-        start a while loop that sends 'command' to tello every 5 second
-        """
-
         while True:
-            self.drone.connect()
-            time.sleep(5)
-            print("driver: Sent keepalive command to Tello")
+            try:
+                message = self._frames_conn.recv()
+            except (EOFError, OSError):
+                print("driver: decoder process exited.")
+                return
+
+            if message[0] == 'frame':
+                _, slot, seq, timestamp = message
+                frame = self.shared_frames.read(slot, seq)
+                if frame is not None:
+                    self.frames.push(frame, timestamp)
+            elif message[0] == 'stats':
+                self._process_stats = message[1]
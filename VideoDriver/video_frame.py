@@ -0,0 +1,54 @@
+import cv2
+
+
+class VideoFrame:
+    """
+    A decoded video frame.
+
+    Only the representation the driver was asked for is produced by the decode stage;
+    the other one (BGR or grayscale) is converted on first access and then kept.
+    `small` is the optional downscaled grayscale image made in the decode stage for OCR.
+    `seq` and `timestamp` are set when the frame is stored in the driver's FrameRing.
+    """
+
+    __slots__ = ('seq', 'timestamp', 'corrupted', 'small', '_gray', '_bgr', '_make_gray', '_make_bgr',
+                 '_make_i420', '__weakref__')
+
+    def __init__(self, gray=None, bgr=None, make_gray=None, make_bgr=None, small=None, corrupted=False,
+                 make_i420=None):
+        self.seq = 0
+        self.timestamp = None  # capture time (time.monotonic) of the first packet of the picture
+        self.corrupted = corrupted  # decoded while the stream was damaged by packet loss
+        self.small = small
+
+        self._gray = gray
+        self._bgr = bgr
+        self._make_gray = make_gray
+        self._make_bgr = make_bgr
+        self._make_i420 = make_i420
+
+    @property
+    def gray(self):
+        """Height x width luma/grayscale image."""
+        if self._gray is None:
+            self._gray = self._make_gray()
+        return self._gray
+
+    @property
+    def bgr(self):
+        """Height x width x 3 BGR image, the format OpenCV expects for display and imwrite."""
+        if self._bgr is None:
+            self._bgr = self._make_bgr()
+        return self._bgr
+
+    @property
+    def i420(self):
+        """(height * 3/2) x width planar YUV 4:2:0 image, used to hand frames between processes."""
+        if self._make_i420 is not None:
+            return self._make_i420()
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2YUV_I420)
+
+    @property
+    def shape(self):
+        image = self._gray if self._gray is not None else self._bgr
+        return image.shape[:2]
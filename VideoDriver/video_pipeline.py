@@ -0,0 +1,167 @@
+import socket
+import threading
+import time
+
+import cv2
+
+from .annexb_parser import AnnexBParser
+from .decoders import DecoderBackend, create_decoder
+from .loss_detector import LossDetector
+from .packet_buffer import PacketBuffer
+from .shared_frame_ring import SharedFrameRing
+from .video_receiver import VideoReceiver
+
+
+class VideoPipeline:
+    """
+    The receive and decode stage of the VideoDriver.
+
+    UDP datagrams -> PacketBuffer -> access units -> loss detection -> decoder. Every decoded
+    VideoFrame is handed to `publish(frame, timestamp)`. Runs in the driver's receive thread,
+    or in a child process (see run_pipeline_process) when the driver is in process mode.
+    """
+
+    def __init__(self, publish, video_ip='0.0.0.0', video_port=11111, rcvbuf_size=4 * 1024 * 1024,
+                 batch_size=64, decoder='auto', output_mode='bgr', scale_percent=None,
+                 decode_during_resync=False):
+        self.publish = publish
+        self.scale_percent = scale_percent  # if set, the decode stage also makes a downscaled grayscale copy
+        # After a loss, decode (and flag as corrupted) instead of skipping until the next keyframe
+        self.decode_during_resync = decode_during_resync
+        self.running = True
+
+        # 'h264decoder', 'pyav', 'auto' or a ready DecoderBackend
+        if isinstance(decoder, DecoderBackend):
+            self.decoder = decoder
+        else:
+            self.decoder = create_decoder(decoder, output_mode)
+
+        # socket for receiving video stream, drained in batches straight into packet_buffer
+        self.receiver = VideoReceiver(video_ip, video_port, rcvbuf_size=rcvbuf_size, batch_size=batch_size)
+        self.packet_buffer = PacketBuffer()
+        self.parser = AnnexBParser(self.packet_buffer)  # splits the buffered stream into access units
+        self.loss_detector = LossDetector()
+
+    def close(self):
+        self.running = False
+        self.receiver.close()
+
+    def stats(self):
+        return {
+            'receive': self.receiver.stats(),
+            'loss': self.loss_detector.stats(),
+        }
+
+    def run(self):
+        """
+        Listens for video streaming (raw h264) from the Tello, until close() is called.
+
+        Each wakeup drains every queued datagram into self.packet_buffer (no per-packet copies),
+        then the decoder is handed the access units completed by the new data, one at a time.
+
+        """
+        while self.running:
+            try:
+                if not self.receiver.wait(1.0):
+                    # Stream went quiet, don't hold back the last picture
+                    unit = self.parser.flush()
+                    if unit is not None:
+                        self._decode_unit(unit)
+                    continue
+
+                self.receiver.receive_batch(self.packet_buffer)
+                self.loss_detector.observe_datagrams(self.receiver.datagrams)
+                if self.loss_detector.observe_kernel_drops(self.receiver.kernel_drops):
+                    # Can't tell which of the buffered pictures lost data, drop them all and resync
+                    self.parser.reset()
+                    continue
+
+                for unit in self.parser.parse(time.monotonic()):
+                    self._decode_unit(unit)
+
+            except (socket.error, ValueError) as exc:
+                if not self.running:
+                    break  # socket closed under us
+                print("Caught exception socket.error : %s" % exc)
+
+    def _decode_unit(self, unit):
+        corrupted = False
+        if not self.loss_detector.accept(unit):
+            if not self.decode_during_resync:
+                return
+            corrupted = True
+
+        try:
+            frames = self.decoder.decode(unit.data)
+        except Exception as exc:
+            print("driver: decoder error: %s" % exc)
+            self.loss_detector.observe_decoder_error()
+            return
+
+        for frame in frames:
+            frame.corrupted = corrupted
+            if self.scale_percent:
+                frame.small = self._downscale(frame.gray)
+            self.publish(frame, unit.timestamp if unit.timestamp is not None else time.monotonic())
+
+    def _downscale(self, gray):
+        width = int(gray.shape[1] * self.scale_percent / 100)
+        height = int(gray.shape[0] * self.scale_percent / 100)
+        return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def run_pipeline_process(ring_name, ring_capacity, ring_lock, frames_conn, control_conn, options,
+                         stats_interval=1.0):
+    """
+    Entry point of the decoder process.
+
+    Decoded frames are written into the SharedFrameRing `ring_name` (slots picked under
+    `ring_lock`, shared with the reader) and announced on `frames_conn` as
+    ('frame', slot, seq, timestamp); the pipeline stats follow every `stats_interval` seconds
+    as ('stats', dict). `control_conn` receives ('set', name, value)
+    to change a pipeline attribute (e.g. scale_percent) and ('stop',).
+    """
+    ring = SharedFrameRing(ring_capacity, name=ring_name, lock=ring_lock)
+    send_lock = threading.Lock()
+    seq = 0
+
+    def publish(frame, timestamp):
+        nonlocal seq
+        seq += 1
+        slot = ring.write(frame, seq, timestamp)
+        if slot is not None:
+            with send_lock:
+                frames_conn.send(('frame', slot, seq, timestamp))
+
+    pipeline = VideoPipeline(publish, **options)
+
+    def control():
+        while True:
+            try:
+                message = control_conn.recv()
+            except EOFError:
+                message = ('stop',)  # the driver went away
+            if message[0] == 'stop':
+                pipeline.close()
+                return
+            if message[0] == 'set':
+                setattr(pipeline, message[1], message[2])
+
+    def report():
+        while pipeline.running:
+            time.sleep(stats_interval)
+            stats = pipeline.stats()
+            stats['shared_ring'] = ring.stats()
+            try:
+                with send_lock:
+                    frames_conn.send(('stats', stats))
+            except (OSError, EOFError):
+                return
+
+    threading.Thread(target=control, daemon=True).start()
+    threading.Thread(target=report, daemon=True).start()
+    try:
+        pipeline.run()
+    finally:
+        ring.close()
+        frames_conn.close()
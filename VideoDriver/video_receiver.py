@@ -0,0 +1,112 @@
+import select
+import socket
+import struct
+import sys
+import time
+
+# Linux can report how many datagrams the kernel dropped because the socket
+# buffer was full (SO_RXQ_OVFL). Python does not export the constant.
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40 if sys.platform.startswith('linux') else None)
+
+
+class VideoReceiver:
+    """
+    Non-blocking UDP receiver for the Tello video stream.
+
+    Every wakeup drains all datagrams the kernel has queued (up to `batch_size`) straight
+    into a PacketBuffer, and keeps byte/packet/kernel-drop counters for the stats. The size of
+    each datagram of the last batch and the time since the one before it (read time, so
+    datagrams queued together look back to back) are kept in `datagrams` for the LossDetector.
+    """
+
+    def __init__(self, video_ip='0.0.0.0', video_port=11111, rcvbuf_size=4 * 1024 * 1024, batch_size=64):
+        self.batch_size = batch_size
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if rcvbuf_size:
+            # The OS may clamp this (see net.core.rmem_max on Linux), the real value is read back below
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf_size)
+        self.socket.bind((video_ip, video_port))
+        self.socket.setblocking(False)
+        self.rcvbuf_size = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        self.track_drops = False
+        if SO_RXQ_OVFL is not None and hasattr(self.socket, 'recvmsg_into'):
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self.track_drops = True
+            except OSError:
+                pass
+        self._ancbufsize = socket.CMSG_SPACE(4) if self.track_drops else 0
+
+        self.bytes_total = 0
+        self.packets_total = 0
+        self.batches_total = 0
+        self.kernel_drops = 0 if self.track_drops else None
+        self.datagrams = []  # (size, seconds since the previous datagram) of the last batch
+        self._last_arrival = None
+        self._last_sample = (time.monotonic(), 0, 0)
+
+    def close(self):
+        self.socket.close()
+
+    def wait(self, timeout=1.0):
+        """Sleep until a datagram is queued or `timeout` seconds pass. Returns True if data is ready."""
+        readable, _, _ = select.select([self.socket], [], [], timeout)
+        return bool(readable)
+
+    def receive_batch(self, buffer):
+        """
+        Receive the queued datagrams into `buffer`.
+
+        Stops when the socket queue is empty or `batch_size` datagrams were read.
+
+        :return: the number of datagrams received
+        """
+        packets = 0
+        size_total = 0
+        self.datagrams = []
+        while packets < self.batch_size:
+            try:
+                if self.track_drops:
+                    size, ancdata = buffer.recvmsg_into(self.socket, self._ancbufsize)
+                    self._read_drops(ancdata)
+                else:
+                    size = buffer.recv_into(self.socket)
+            except (BlockingIOError, InterruptedError):
+                break
+
+            now = time.monotonic()
+            self.datagrams.append((size, 0.0 if self._last_arrival is None else now - self._last_arrival))
+            self._last_arrival = now
+            packets += 1
+            size_total += size
+
+        if packets:
+            self.packets_total += packets
+            self.bytes_total += size_total
+            self.batches_total += 1
+        return packets
+
+    def _read_drops(self, ancdata):
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL and len(data) >= 4:
+                # Cumulative number of datagrams dropped since the socket was opened
+                self.kernel_drops = struct.unpack('=I', data[:4])[0]
+
+    def stats(self):
+        """Receive counters, with rates averaged since the previous call."""
+        now = time.monotonic()
+        last_time, last_bytes, last_packets = self._last_sample
+        elapsed = max(now - last_time, 1e-6)
+        self._last_sample = (now, self.bytes_total, self.packets_total)
+
+        return {
+            'bytes': self.bytes_total,
+            'packets': self.packets_total,
+            'bytes_per_second': (self.bytes_total - last_bytes) / elapsed,
+            'packets_per_second': (self.packets_total - last_packets) / elapsed,
+            'packets_per_batch': self.packets_total / self.batches_total if self.batches_total else 0.0,
+            'kernel_drops': self.kernel_drops,
+            'rcvbuf_size': self.rcvbuf_size,
+        }
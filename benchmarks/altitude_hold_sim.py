@@ -0,0 +1,72 @@
+"""
+HeightGuard against a simulated drone (vertical dynamics only, see HeightGuard.SimulatedDrone).
+
+    python -m benchmarks.altitude_hold_sim
+    python -m benchmarks.altitude_hold_sim --mode step --seconds 40
+    python -m benchmarks.altitude_hold_sim --gains 2.5 1.0 0.4 --rate 50
+
+The drone starts 30 cm below the target and sinks slowly; halfway through, a downdraft
+pushes it down at --gust cm/s for 3 s. The hold error is sampled every 20 ms once the
+first second has passed.
+"""
+import argparse
+import time
+
+from HeightGuard import HeightGuard, SimulatedDrone
+from Telemetry import Telemetry
+from .decoder_bench import percentile
+
+
+def run(mode, seconds, target, gains, rate, gust, sensor):
+    telemetry = Telemetry()  # fed by the simulator, no socket
+    drone = SimulatedDrone(telemetry, height=target - 30)
+    drone.start()
+    time.sleep(0.2)  # first state packets
+
+    guard = HeightGuard(target, drone, telemetry, mode=mode, rate=rate, gains=gains, sensor=sensor)
+    errors = []
+    started = time.monotonic()
+    gust_at = started + seconds / 2
+    while True:
+        now = time.monotonic()
+        if now - started >= seconds:
+            break
+        drone.disturb(-gust if gust_at <= now < gust_at + 3 else 0.0)
+        if now - started >= 1.0:
+            errors.append(drone.height - target)
+        time.sleep(0.02)
+    stop_started = time.monotonic()
+    guard.stop()
+    stop_time = time.monotonic() - stop_started
+    drone.stop()
+
+    absolute = [abs(error) for error in errors]
+    return {
+        'mean_abs_cm': sum(absolute) / len(absolute),
+        'p95_abs_cm': percentile(absolute, 95),
+        'max_abs_cm': max(absolute),
+        'rc_per_second': drone.rc_commands / seconds,
+        'commands': drone.commands,
+        'stop_ms': 1000 * stop_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('hold', 'step'), default='hold')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--target', type=int, default=110, help="cm")
+    parser.add_argument('--gains', type=float, nargs=3, default=(2.0, 0.6, 0.3), metavar=('KP', 'KI', 'KD'))
+    parser.add_argument('--rate', type=int, default=30, help="control loop Hz (hold mode)")
+    parser.add_argument('--gust', type=float, default=20, help="downdraft, cm/s")
+    parser.add_argument('--sensor', choices=('tof', 'h'), default='tof')
+    args = parser.parse_args()
+
+    result = run(args.mode, args.seconds, args.target, tuple(args.gains), args.rate, args.gust, args.sensor)
+    print("%s: error mean %.1f cm  p95 %.1f cm  max %.1f cm  rc %.1f/s  other commands %d  stop() %.0f ms" % (
+        args.mode, result['mean_abs_cm'], result['p95_abs_cm'], result['max_abs_cm'], result['rc_per_second'],
+        result['commands'], result['stop_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Decoder benchmark: decodes a recorded Tello stream through every decoder backend.
+
+Record a raw stream first (drone connected over Wi-Fi):
+    python -m benchmarks.decoder_bench --record 20 tello.h264
+
+Then compare the backends:
+    python -m benchmarks.decoder_bench tello.h264
+    python -m benchmarks.decoder_bench tello.h264 --backend pyav --mode gray --threads 4 --thread-type SLICE
+
+PyAV runs with slice threading by default here: frame threading (libavcodec's default) holds
+every frame back by up to `--threads` frames, which is latency this benchmark is about.
+
+Each backend runs in a fresh process so the peak RSS numbers don't leak into each other.
+"""
+import argparse
+import multiprocessing
+import socket
+import sys
+import time
+
+from VideoDriver.annexb_parser import AnnexBParser
+from VideoDriver.decoders import BACKENDS, create_decoder
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (None if it can't be measured)."""
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 1024
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def split_units(path):
+    parser = AnnexBParser()
+    with open(path, 'rb') as stream:
+        units = parser.feed(stream.read())
+    unit = parser.flush()
+    if unit is not None:
+        units.append(unit)
+    return units
+
+
+def run_backend(path, backend, mode, options):
+    units = split_units(path)
+    decoder = create_decoder(backend, mode, **options)
+
+    latencies = []
+    frames = 0
+    started = time.perf_counter()
+    for unit in units:
+        unit_started = time.perf_counter()
+        for frame in decoder.decode(unit.data):
+            # Make the backend produce what the driver would hand out: the lazy conversion is part of the cost
+            _ = frame.gray if mode == 'gray' else frame.bgr
+            frames += 1
+        latencies.append(time.perf_counter() - unit_started)
+    elapsed = time.perf_counter() - started
+    decoder.close()
+
+    return {
+        'backend': backend,
+        'units': len(units),
+        'frames': frames,
+        'fps': frames / elapsed if elapsed else 0.0,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p95_ms': 1000 * percentile(latencies, 95),
+        'max_ms': 1000 * max(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _worker(path, backend, mode, options, results):
+    try:
+        results.put(run_backend(path, backend, mode, options))
+    except Exception as exc:
+        results.put({'backend': backend, 'error': "failed: %s" % exc})
+
+
+def record(path, seconds, video_ip='0.0.0.0', video_port=11111):
+    """Dump the raw video stream of a connected Tello to `path`."""
+    from djitellopy import Tello
+
+    drone = Tello()
+    drone.connect()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((video_ip, video_port))
+    sock.settimeout(1.0)
+    drone.streamon()
+
+    size = 0
+    deadline = time.monotonic() + seconds
+    with open(path, 'wb') as stream:
+        while time.monotonic() < deadline:
+            try:
+                data = sock.recv(2048)
+            except socket.timeout:
+                continue
+            stream.write(data)
+            size += len(data)
+
+    drone.streamoff()
+    sock.close()
+    print("bench: recorded %d bytes in %d s to %s" % (size, seconds, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('stream', help="raw H.264 (Annex-B) file recorded from the Tello")
+    parser.add_argument('--record', type=int, metavar='SECONDS', help="record the drone's stream to STREAM first")
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS), help="default: all of them")
+    parser.add_argument('--mode', choices=('bgr', 'gray'), default='bgr')
+    parser.add_argument('--threads', type=int, default=1, help="decoder threads, 0: libavcodec picks (pyav only)")
+    parser.add_argument('--thread-type', choices=('SLICE', 'FRAME', 'AUTO'), default='SLICE',
+                        help="libavcodec threading (pyav only)")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.stream, args.record)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    for backend in args.backend or sorted(BACKENDS):
+        options = {'threads': args.threads, 'thread_type': args.thread_type} if backend == 'pyav' else {}
+        process = context.Process(target=_worker, args=(args.stream, backend, args.mode, options, results))
+        process.start()
+        result = results.get()
+        process.join()
+
+        if 'error' in result:
+            print("%-12s %s" % (backend, result['error']))
+            continue
+        rss = result['peak_rss_mb']
+        print("%-12s %5d frames  %7.1f fps  latency mean %6.2f ms  p50 %6.2f ms  p95 %6.2f ms  max %6.2f ms  "
+              "peak RSS %s" % (backend, result['frames'], result['fps'], result['mean_ms'], result['p50_ms'],
+                               result['p95_ms'], result['max_ms'], "n/a" if rss is None else "%.1f MiB" % rss))
+
+
+if __name__ == '__main__':
+    main()
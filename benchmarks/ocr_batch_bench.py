@@ -0,0 +1,110 @@
+"""
+Batched recognition benchmark: throughput and latency of EasyOCR's recognizer behind a
+RecognitionBatcher, for every combination of batch size and deadline.
+
+    python -m benchmarks.ocr_batch_bench
+    python -m benchmarks.ocr_batch_bench --batch 1 4 8 16 --deadline 0 10 20 50 --producers 4
+
+Each producer thread stands for an OCR worker (or a drone) and sends the crops of one frame
+(1 to 3 synthetic letter cards) at a time, waiting for their results before the next frame.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import cv2
+
+from OCRPool import RecognitionBatcher, mosaic_recognize
+from OCRPool.letter_classifier import LETTERS
+from .decoder_bench import percentile
+
+
+def letter_crops(count, seed=0):
+    """Grayscale crops of single letters on a light card, like the RegionDetector hands out."""
+    rng = np.random.default_rng(seed)
+    crops = []
+    for i in range(count):
+        size = int(rng.integers(48, 120))
+        crop = np.full((size, size), int(rng.integers(200, 245)), dtype=np.uint8)
+        scale = size / 40
+        (w, h), _ = cv2.getTextSize(LETTERS[i % len(LETTERS)], cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+        thickness = max(1, int(size / 12))
+        cv2.putText(crop, LETTERS[i % len(LETTERS)], ((size - w) // 2, (size + h) // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, int(rng.integers(10, 60)), thickness, cv2.LINE_AA)
+        crops.append(crop)
+    return crops
+
+
+def run_setting(reader, crops, max_batch, deadline, producers, frames):
+    batcher = RecognitionBatcher(lambda batch: mosaic_recognize(reader, batch, allowlist=LETTERS),
+                                 max_batch, deadline)
+    latencies = []
+    correct = [0]
+    lock = threading.Lock()
+
+    def produce(index):
+        rng = np.random.default_rng(index)
+        for _ in range(frames):
+            picked = rng.choice(len(crops), int(rng.integers(1, 4)), replace=False)
+            started = time.perf_counter()
+            results = batcher.recognize([crops[i] for i in picked])
+            latency = time.perf_counter() - started
+            with lock:
+                latencies.append(latency)
+                correct[0] += sum(text == LETTERS[i % len(LETTERS)] for i, (text, _) in zip(picked, results))
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    batcher.stop()
+
+    stats = batcher.stats()
+    return {
+        'crops_per_second': stats['crops'] / elapsed,
+        'mean_batch_size': stats['mean_batch_size'],
+        'accuracy': correct[0] / stats['crops'] if stats['crops'] else 0.0,
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p95_ms': 1000 * percentile(latencies, 95),
+        'max_ms': 1000 * max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="max batch sizes")
+    parser.add_argument('--deadline', type=float, nargs='+', default=[0, 10, 20, 50], help="deadlines in ms")
+    parser.add_argument('--producers', type=int, default=4, help="concurrent callers")
+    parser.add_argument('--frames', type=int, default=50, help="frames sent by every producer")
+    parser.add_argument('--torch-threads', type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    try:
+        from OCRPool import create_reader
+        reader = create_reader()
+    except ImportError as exc:
+        print("bench: easyocr is required: %s" % exc)
+        return
+    if args.torch_threads:
+        import torch
+        torch.set_num_threads(args.torch_threads)
+
+    crops = letter_crops(64)
+    mosaic_recognize(reader, crops[:4], allowlist=LETTERS)  # warm up
+
+    print("%5s %8s  %10s %8s %8s %9s %9s %9s" % ('batch', 'deadline', 'crops/s', 'mean bs', 'accuracy',
+                                                'p50 ms', 'p95 ms', 'max ms'))
+    for max_batch in args.batch:
+        for deadline in args.deadline:
+            result = run_setting(reader, crops, max_batch, deadline / 1000, args.producers, args.frames)
+            print("%5d %6.0fms  %10.1f %8.2f %8.2f %9.1f %9.1f %9.1f" % (
+                max_batch, deadline, result['crops_per_second'], result['mean_batch_size'], result['accuracy'],
+                result['p50_ms'], result['p95_ms'], result['max_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Command channel benchmark: djitellopy against the AsyncTello client (directly and through the
+TelloBridge), talking to a local UDP stand-in for the Tello.
+
+    python -m benchmarks.tello_command_bench
+    python -m benchmarks.tello_command_bench --commands 100 --rounds 50 --service 5 --loss 0.01
+    python -m benchmarks.tello_command_bench --gap 0
+
+Two workloads:
+  control  `--commands` control commands one after the other ('command' -> 'ok')
+  queries  `--rounds` rounds of the 6 read queries a status display needs (battery?, height?...),
+           one after the other with djitellopy, pipelined (query_many) with AsyncTello
+
+The stand-in answers one command at a time like the drone, after `--service` ms (plus up to
+50 % jitter), and loses `--loss` of its answers. Lost answers cost the client's timeout
+(`--timeout`, for both clients) and a retry. AsyncTello waits one more timeout before the retry:
+the answer might still come, and would be taken for the retry's. Latencies are per command for control, per round
+of 6 queries for queries; ops/s counts commands. Every answer is checked against the one the
+stand-in gives to its query, 'wrong' counts the answers handed to the wrong command.
+
+AsyncTello keeps `--gap` ms between the commands it sends (command_interval, 100 ms by
+default like Tello.TIME_BTW_COMMANDS: the real drone drops commands that come faster).
+djitellopy 2.5 only waits as long as it has been since the last answer, next to nothing here.
+--gap 0 shows what pipelining gives when the drone keeps up.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+
+from djitellopy import Tello
+
+from AsyncTello import AsyncTello, TelloBridge
+from .decoder_bench import percentile
+
+QUERIES = ('battery?', 'height?', 'speed?', 'time?', 'tof?', 'temp?')
+ANSWERS = {'battery?': '87', 'height?': '10dm', 'speed?': '100', 'time?': '42s', 'tof?': '1005mm',
+           'temp?': '60~62C'}
+
+
+class TelloStandIn:
+    """Answers Tello commands on a local UDP port, one at a time, like the drone's command loop."""
+
+    def __init__(self, port, service=0.003, loss=0.0, seed=0):
+        self.service = service
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', port))
+        self.port = self.socket.getsockname()[1]
+        self.received = 0
+        self.lost = 0
+        thread = threading.Thread(target=self._serve)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        self.socket.close()
+
+    def _serve(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(1024)
+            except OSError:
+                return
+            self.received += 1
+            command = data.decode('utf-8')
+            if command.startswith('rc '):
+                continue  # no answer
+            time.sleep(self.service * (1 + 0.5 * self.random.random()))
+            if self.random.random() < self.loss:
+                self.lost += 1
+                continue
+            self.socket.sendto(ANSWERS.get(command, 'ok').encode('utf-8'), address)
+
+
+def count_wrong(queries, answers):
+    """
+    Answers that aren't the stand-in's answer to their query. Failed queries (exceptions,
+    djitellopy's 'Aborting command...') don't count. Control commands all get 'ok', a wrong
+    one can't be told from a right one: 'wrong' is only counted for the queries.
+    """
+    return sum(1 for query, answer in zip(queries, answers)
+               if isinstance(answer, str) and not answer.startswith('Aborting') and answer != ANSWERS[query])
+
+
+def summarize(latencies, elapsed, operations, wrong):
+    return {
+        'per_second': operations / elapsed,
+        'wrong': wrong,
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p95_ms': 1000 * percentile(latencies, 95),
+        'p99_ms': 1000 * percentile(latencies, 99),
+        'max_ms': 1000 * max(latencies),
+    }
+
+
+def bench_djitellopy(port, args):
+    # djitellopy binds its command and state ports at the first Tello(); moved out of the way of the
+    # real ones, the drone address is pointed at the stand-in afterwards
+    Tello.CONTROL_UDP_PORT = args.client_port
+    Tello.STATE_UDP_PORT = args.client_port + 1
+    tello = Tello(host='127.0.0.1')
+    tello.address = ('127.0.0.1', port)
+
+    results = {}
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.commands):
+        sent = time.perf_counter()
+        try:
+            tello.send_control_command('command', timeout=args.timeout)
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - sent)
+    results['control'] = summarize(latencies, time.perf_counter() - started, args.commands, 0)
+
+    latencies = []
+    wrong = 0
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        sent = time.perf_counter()
+        answers = [tello.send_command_with_return(query, timeout=args.timeout) for query in QUERIES]
+        latencies.append(time.perf_counter() - sent)
+        wrong += count_wrong(QUERIES, answers)
+    results['queries'] = summarize(latencies, time.perf_counter() - started, args.rounds * len(QUERIES), wrong)
+    return results
+
+
+async def bench_async_client(client, args):
+    results = {}
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.commands):
+        sent = time.perf_counter()
+        try:
+            await client.send_control_command('command')
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - sent)
+    results['control'] = summarize(latencies, time.perf_counter() - started, args.commands, 0)
+
+    latencies = []
+    wrong = 0
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        sent = time.perf_counter()
+        answers = await asyncio.gather(*(client.send_read_command(query) for query in QUERIES),
+                                       return_exceptions=True)
+        latencies.append(time.perf_counter() - sent)
+        wrong += count_wrong(QUERIES, answers)
+    results['queries'] = summarize(latencies, time.perf_counter() - started, args.rounds * len(QUERIES), wrong)
+    return results
+
+
+def new_client(port, args):
+    return AsyncTello(host='127.0.0.1', command_port=port, local_command_port=0, state_port=None,
+                      timeout=args.timeout, max_in_flight=len(QUERIES), command_interval=args.gap / 1000)
+
+
+def bench_asyncio(port, args):
+    async def run():
+        async with new_client(port, args) as client:
+            return await bench_async_client(client, args)
+    return asyncio.run(run())
+
+
+def bench_bridge(port, args):
+    bridge = TelloBridge(new_client(port, args))
+    results = {}
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.commands):
+        sent = time.perf_counter()
+        try:
+            bridge.connect()
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - sent)
+    results['control'] = summarize(latencies, time.perf_counter() - started, args.commands, 0)
+
+    # Synchronous callers: one thread per query, like the separate concerns of main.py
+    latencies = []
+    wrong = 0
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        sent = time.perf_counter()
+        answers = [None] * len(QUERIES)
+
+        def ask(index):
+            try:
+                answers[index] = bridge.send_read_command(QUERIES[index])
+            except Exception as e:
+                answers[index] = e
+
+        threads = [threading.Thread(target=ask, args=(index,)) for index in range(len(QUERIES))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies.append(time.perf_counter() - sent)
+        wrong += count_wrong(QUERIES, answers)
+    results['queries'] = summarize(latencies, time.perf_counter() - started, args.rounds * len(QUERIES), wrong)
+    bridge.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=50, help="control commands per client")
+    parser.add_argument('--rounds', type=int, default=20, help="query rounds per client")
+    parser.add_argument('--service', type=float, default=3.0, help="stand-in time per command, in ms")
+    parser.add_argument('--loss', type=float, default=0.0, help="fraction of answers the stand-in drops")
+    parser.add_argument('--timeout', type=int, default=1, help="answer timeout of both clients, in whole s")
+    parser.add_argument('--gap', type=float, default=1000 * Tello.TIME_BTW_COMMANDS,
+                        help="AsyncTello's minimum gap between commands, in ms")
+    parser.add_argument('--client-port', type=int, default=18889, help="djitellopy's command port (+1: state)")
+    args = parser.parse_args()
+
+    print("%-10s %-8s %10s %9s %9s %9s %9s %6s" % ('client', 'workload', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms',
+                                                   'max ms', 'wrong'))
+    for name, bench in (('djitellopy', bench_djitellopy), ('asyncio', bench_asyncio), ('bridge', bench_bridge)):
+        stand_in = TelloStandIn(0, service=args.service / 1000, loss=args.loss)
+        results = bench(stand_in.port, args)
+        stand_in.close()
+        for workload, result in results.items():
+            print("%-10s %-8s %10.1f %9.1f %9.1f %9.1f %9.1f %6d" % (
+                name, workload, result['per_second'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                result['max_ms'], result['wrong']))
+        print("%-10s %d answers lost" % ('', stand_in.lost))
+
+
+if __name__ == '__main__':
+    main()
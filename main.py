@@ -1,34 +1,105 @@
-print("program: loading ML models...")
+import startup_clock  # first: the startup report counts the imports
 import time
 from djitellopy import Tello, TelloException
 import cv2
-import easyocr
 import threading
 import queue
 from VideoDriver import VideoDriver
 from HeightGuard import HeightGuard
-
-print("program: finished loading ML models...")
+from Telemetry import Telemetry
+from CommandArbiter import CommandArbiter, MANUAL, MISSION, HOUSEKEEPING
+from OCRPool import (OCRPool, ChangeGate, BatchedLetterReaderFactory, DetectionAggregator, ROITracker, ScaleController,
+                     ResultCache, DutyCycleGovernor, GROUNDED, SEARCHING, ACTION, LANDING, FreshnessGate)
 
 camera = None
 drone = None
-reader = easyocr.Reader(['en'])
-scale_percent = 40
+# Every drone command goes through the arbiter, one at a time, by priority:
+# emergency > landing > manual (keys) > mission (letter actions, height guard) > housekeeping (keepalive, video)
+arbiter = None
+manual_drone = None  # the drone as the key handler sees it
+mission_drone = None  # ... and as the letter actions and the height guard see it
+telemetry = Telemetry()  # height, battery... pushed by the drone's state stream
+ocr_workers = 3  # frames OCR'd at the same time
+# Only glyph-sized regions are read, by the built-in A-H classifier and, when it is unsure, by EasyOCR.
+# The workers share one EasyOCR reader that recognizes their crops in batches (max 8 crops, 20 ms window).
+# They are threads, not processes (OCRPool's mode='process'): only one reader is loaded, used by one thread at a
+# time, and batching only works within a process. The workers' own work (regions, classifier) is light next to it.
+# The full text detector runs when no region is found. Crops that look like one read in the last 2 s reuse its result.
+# Frames that look like the last OCR'd one (e.g. while hovering) are skipped, at least one OCR per second
+ocr_readers = BatchedLetterReaderFactory(max_batch=8, deadline=0.02, cache=ResultCache(max_size=256, ttl=2.0))
+ocr_pool = OCRPool(workers=ocr_workers, mode='thread', reader_factory=ocr_readers,
+                   gate=ChangeGate(threshold=6.0, max_interval=1.0))
+# A letter has to be read in 3 of the last 8 OCR results to trigger, once per appearance
+detections = DetectionAggregator(window=8, min_votes=3, min_confidence=0.8, letters='ABCDEFGH')
+# Confirmed letters are followed with optical flow and re-checked by the classifier every 10 frames
+tracker = ROITracker(recognize=lambda crop: ocr_readers.classifier.classify(crop), recheck_every=10)
+# OCR input scale: starts small, goes up while nothing (or nothing certain) is read, within 150 ms per frame
+scale_controller = ScaleController(levels=(30, 40, 50, 65, 80), budget=0.15)
+# OCR at full rate while searching, 1/s on the ground, paused during actions and landing
+ocr_duty_cycle = DutyCycleGovernor()
+detection_deadline = 0.5  # seconds, older detections only trigger if the letter is still tracked
+
+
+def letter_still_tracked(event):
+    """
+    Re-confirms a stale detection: the tracker followed the letter in a frame newer than the
+    detection's, captured within the deadline. Waits a few frames for one if needed.
+    """
+    give_up = time.monotonic() + detection_deadline
+    while True:
+        seen = tracker.last_seen(event.text)
+        if seen is None:
+            return False  # lost since
+        if seen > event.timestamp and time.monotonic() - seen <= detection_deadline:
+            return True
+        if time.monotonic() >= give_up:
+            return False
+        time.sleep(0.02)
+
+
+freshness = FreshnessGate(deadline=detection_deadline, reconfirm=letter_still_tracked)
 ack_frozen = False
 has_taken_off = False
 height_guard = None
+# has_taken_off and height_guard are changed by the key handlers ('e' and 'l' run on threads of their own) and the
+# actions. Only the changes are locked, never the drone commands: an emergency can't wait for a move to finish
+flight_lock = threading.Lock()
 key_queue = queue.Queue()
 action_queue = queue.Queue()  # Queue for letter-triggered actions
 action_in_progress = False  # Flag to track if action is running
 action_lock = threading.Lock()  # Thread-safe lock for the flag
+letters_to_rearm = set()  # detected letters no action was run for, they can trigger again once no action runs
 
 
 def main():
-    global camera, ack_frozen, scale_percent, drone, has_taken_off, height_guard, action_in_progress
+    global camera, ack_frozen, drone, has_taken_off, height_guard, action_in_progress, arbiter, manual_drone, \
+        mission_drone
 
-    camera = VideoDriver()
+    startup_times = {'import': time.perf_counter() - startup_clock.started}
+
+    # Loaded here rather than at import time: the decoder process re-imports this module.
+    # The OCR workers import EasyOCR, load and warm up the models in the background while the
+    # drone connects and the first keyframe arrives; frames submitted before they're ready wait for them
+    print("program: loading ML models in the background...")
+    ocr_pool.start()
+    models_ready = threading.Event()  # set once every worker has loaded its model (or failed to)
+    threading.Thread(target=lambda: (ocr_pool.wait_ready(), models_ready.set()), daemon=True).start()
+    telemetry.start()  # before connecting, so the first state packets are already cached
+
+    drone = Tello()
+    arbiter = CommandArbiter(drone)
+    arbiter.start()
+    manual_drone = arbiter.proxy(MANUAL)
+    mission_drone = arbiter.proxy(MISSION)
+
+    # Grayscale output: OCR reads the luma straight from the decoder, BGR is only built for display.
+    # Decoding runs in its own process so OCR can't starve it. Its keepalive and stream commands are housekeeping
+    # The decoder makes the downscaled OCR input from the first frame on
+    camera = VideoDriver(config=arbiter.proxy(HOUSEKEEPING), output_mode='gray', process=True,
+                         scale_percent=scale_controller.scale_percent)
+    connect_started = time.perf_counter()
     camera.initialize()
-    drone = camera.drone
+    startup_times['connect'] = time.perf_counter() - connect_started
 
     # Start key handler thread
     key_thread = threading.Thread(target=thread__wait_key, daemon=True)
@@ -38,84 +109,174 @@ def main():
     action_thread = threading.Thread(target=thread__handle_actions, daemon=True)
     action_thread.start()
 
-    if camera.platform == "DRONE":
-        scale_percent = 50
+    last_seq = 0  # sequence number of the last frame handled
+    waiting_for_frame = False
 
     while True:
-        key = cv2.waitKey(1) & 0xFF
+        # While frozen there is nothing to draw, so block on the keyboard for a while instead of spinning
+        key = cv2.waitKey(100 if camera.frozen else 1) & 0xFF
 
-        # Send key to handler thread if it's not "no key"
-        if key != 255:
+        # Send key to handler thread if it's not "no key".
+        # Emergency and landing get a thread of their own, they can't wait for a move key still being handled
+        if key in (ord('e'), ord('l')):
+            threading.Thread(target=handle_key, args=(key,), daemon=True).start()
+        elif key != 255:
             key_queue.put(key)
 
         if key == ord('q'):
             break
 
-        ret, frame = camera.read()
-        if not ret:
-            print("Failed to grab frame.")
-            continue
-        if ret == 2:
+        if camera.frozen:
             if not ack_frozen:
                 print("Camera is frozen.")
                 ack_frozen = True
             continue
 
-        width = int(frame.shape[1] * scale_percent / 100)
-        height = int(frame.shape[0] * scale_percent / 100)
-        dim = (width, height)
+        # Sleep until the decoder has a new frame, the timeout only keeps the window responsive
+        frame = camera.wait_for_frame(last_seq, timeout=0.1)
+        if frame is None:
+            if not waiting_for_frame:
+                print("Failed to grab frame.")
+                waiting_for_frame = True
+            continue
+        waiting_for_frame = False
+        last_seq = frame.seq
+        if 'first_frame' not in startup_times:
+            startup_times['first_frame'] = time.perf_counter() - startup_clock.started
+        if 'ready' not in startup_times and models_ready.is_set():
+            # Everything up: connected, streaming, models loaded and warmed up
+            startup_times['ready'] = time.perf_counter() - startup_clock.started
+            startup_times['model_load'] = ocr_pool.stats()['load_seconds']
+            print_startup_report(startup_times)
+        if not frame.corrupted and frame.small is not None:
+            # Frames decoded while the stream was damaged by packet loss are skipped, OCR would only read garbage.
+            # So are frames without the OCR copy (none should come, the scale is set before the stream starts)
+            tracker.update(frame)
+            # OCR runs in the pool, if every worker is busy only the newest frame waits for them.
+            # While letters are tracked, the full frame is only scanned every few frames
+            if tracker.wants_full_scan() and ocr_duty_cycle.allow():
+                ocr_pool.submit(frame, frame.small)
+
+        with action_lock:
+            if not action_in_progress and letters_to_rearm:
+                for text in letters_to_rearm:
+                    detections.rearm(text)
+                letters_to_rearm.clear()
 
-        resized = cv2.resize(frame, dim, interpolation=cv2.INTER_AREA)
-        gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-        results = reader.readtext(gray)
+        for result in ocr_pool.get_results():
+            if 'first_ocr' not in startup_times:
+                # Reported on its own: with nothing to read (e.g. on the ground) it may come much later, or never
+                startup_times['first_ocr'] = time.perf_counter() - startup_clock.started
+                print("program: startup: first OCR result after %.2f s" % startup_times['first_ocr'])
+            ocr_scale = round(100 * result.frame.small.shape[1] / result.frame.shape[1])
+            new_scale = scale_controller.observe(ocr_scale, result.duration, [c for _, _, c in result.results])
+            if new_scale != camera.scale_percent:
+                camera.scale_percent = new_scale
 
-        for bbox, text, confidence in results:
-            conf_pct = int(confidence * 100)
-            if conf_pct > 80:
-                print(f"Detected: {text}, Confidence: {conf_pct}%")
+            for event in detections.add(result):
+                tracker.start(event.text, event.confidence, event.bbox, event.frame)
+                print(f"Detected: {event.text}, Confidence: {int(event.confidence * 100)}% "
+                      f"({event.votes} votes, frame {event.seq})")
                 # Only queue action if no action is currently running
                 with action_lock:
                     if not action_in_progress:
-                        action_queue.put((text, frame.copy()))
-                        print(f"Queued action for: {text}")
-                    # else:
-                    #     print(f"Ignored {text} - action already in progress")
+                        action_in_progress = True  # set here so a second letter can't queue behind this one
+                        ocr_duty_cycle.set_phase(ACTION)
+                        action_queue.put(event)
+                        print(f"Queued action for: {event.text}")
+                    else:
+                        letters_to_rearm.add(event.text)
 
-        cv2.imshow('Frame', frame)
+        cv2.imshow('Frame', frame.bgr)
 
+    ocr_pool.stop()
+    pool_stats = ocr_pool.stats()
+    print("program: OCR %d frames submitted, %d done (%.1f/s, %.0f ms each), %d dropped behind busy workers" % (
+        pool_stats['submitted'], pool_stats['completed'], pool_stats['results_per_second'],
+        1000 * pool_stats['mean_duration'], pool_stats['dropped']))
+    if 'gate' in pool_stats:
+        print("program: change gate skipped %d of %d frames (%.0f%%), ~%.1f s of OCR saved" % (
+            pool_stats['gate']['skipped'], pool_stats['gate']['checked'], 100 * pool_stats['gate']['skip_rate'],
+            pool_stats['saved_seconds']))
+    if ocr_readers.cache is not None:
+        cache_stats = ocr_readers.cache.stats()
+        print("program: OCR cache %d hits, %d misses (%.0f%% hit rate), %d evicted, %d expired" % (
+            cache_stats['hits'], cache_stats['misses'], 100 * cache_stats['hit_rate'], cache_stats['evictions'],
+            cache_stats['expirations']))
+    scale_stats = scale_controller.stats()
+    print("program: OCR scale %d%% at exit, %d changes" % (scale_stats['scale_percent'], scale_stats['changes']))
+    for level, stats in scale_stats['levels'].items():
+        if stats['runs']:
+            print("program:   %3d%%  %d runs, %.0f ms, %.0f%% with a confident read" % (
+                level, stats['runs'], stats['latency_ms'] or 0.0, 100 * stats['hit_rate']))
+    action_stats = freshness.stats()
+    if action_stats['actions']:
+        print("program: %d actions, glass-to-action latency mean %.0f ms, max %.0f ms (%d stale detections dropped)"
+              % (action_stats['actions'], action_stats['mean_latency_ms'], action_stats['max_latency_ms'],
+                 action_stats['dropped']))
+    for phase, stats in ocr_duty_cycle.stats()['phases'].items():
+        print("program: %-9s %7.1f s  CPU %7.1f s (%3.0f%%)  OCR'd frames %d  skipped %d" % (
+            phase, stats['seconds'], stats['cpu_seconds'], 100 * stats['cpu_load'], stats['ocr_frames'],
+            stats['skipped_frames']))
+    for name, stats in arbiter.stats()['classes'].items():
+        if stats['commands'] or stats['cancelled'] or stats['coalesced']:
+            print("program: %-12s commands %d (%d shared, %d cancelled, %d timed out, %d preempted) "
+                  "wait %.0f ms, latency mean %.0f ms, max %.0f ms" % (
+                      name, stats['commands'], stats['coalesced'], stats['cancelled'], stats['timeouts'],
+                      stats['preempted'], stats['mean_wait_ms'], stats['mean_latency_ms'], stats['max_latency_ms']))
+    link = camera.keepalive.stats()
+    print("program: link %s, last answer %.1f s ago, longest silence %.1f s, %d keepalives (%d failed)" % (
+        'alive' if link['alive'] else 'LOST', link['idle_seconds'], link['max_idle_seconds'], link['keepalives'],
+        link['failures']))
     camera.release()
+    arbiter.stop()
     cv2.destroyAllWindows()
 
 
+def print_startup_report(times):
+    """
+    import / connect / model load are durations, first frame / ready / first OCR are since the program started.
+    The first OCR result usually comes after this report, it gets a line of its own then.
+    """
+    first_ocr = ", first OCR result after %.2f s" % times['first_ocr'] if 'first_ocr' in times else ""
+    print("program: startup: imports %.2f s, connect + streamon %.2f s, model load + warm-up %.2f s "
+          "(in parallel), first frame after %.2f s, ready after %.2f s%s" % (
+              times['import'], times['connect'], times['model_load'] or 0.0, times['first_frame'],
+              times['ready'], first_ocr))
+
+
 def thread__handle_actions():
     """Handles letter-triggered actions in a separate thread"""
     global camera, drone, has_taken_off, height_guard, action_in_progress
     if isinstance(drone, Tello) and isinstance(camera, VideoDriver):
         while True:
-            try:
-                text, frame = action_queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
-
-            # Set flag that action is in progress
-            with action_lock:
-                action_in_progress = True
+            # Sleep until a letter is detected (the main loop already set action_in_progress)
+            event = action_queue.get()
+            text = event.text
 
             try:
+                # The drone may have moved on since the frame was captured. If so the letter can trigger again
+                if not freshness.check(event):
+                    with action_lock:
+                        letters_to_rearm.add(text)
+                    continue
+                # The latency is recorded right before each action's first drone command (record_action_start)
                 match text:
                     case 'A':
                         print("Action for A - Starting")
-                        drone.rotate_clockwise(360)
+                        record_action_start(event)
+                        mission_drone.rotate_clockwise(360)
                         time.sleep(2)
-                        drone.rotate_counter_clockwise(180)  # Turn to the right
+                        mission_drone.rotate_counter_clockwise(180)  # Turn to the right
                         time.sleep(2)
-                        drone.move_forward(30)  # 30cm forward (absolute terms - to the right of original position)
+                        mission_drone.move_forward(30)  # 30cm forward (absolute terms - right of original position)
                         print("Action for A - Completed")
                     case 'B':
                         print("Action for B - Starting")
                         time.sleep(2)
-                        drone.rotate_clockwise(90)
-                        drone.move_up(20)
+                        record_action_start(event)
+                        mission_drone.rotate_clockwise(90)
+                        mission_drone.move_up(20)
                         print("Waiting for drone to stabilize... (20s left)")
                         time.sleep(20)
                         print("Should take a photo now")
@@ -132,63 +293,67 @@ def thread__handle_actions():
                         time.sleep(5)
                         # Unfreeze
                         camera.set_freeze(False)
-                        drone.flip_forward()
-                        drone.move_forward(40)
+                        mission_drone.flip_forward()
+                        mission_drone.move_forward(40)
                         time.sleep(1.75)
-                        drone.flip_left()
+                        mission_drone.flip_left()
                         time.sleep(1.75)
-                        drone.move_forward(40)
+                        mission_drone.move_forward(40)
                         time.sleep(1.75)
-                        drone.flip_right()
+                        mission_drone.flip_right()
                         time.sleep(1.75)
-                        drone.move_forward(40)
+                        mission_drone.move_forward(40)
 
                         print("Action for B - Completed")
                     case 'C':   # We skip this since this is already pre-defined in the spec
                         print("Action for C - Starting")
-                        drone.land()
-                        # Kill the height guard
-                        if height_guard is not None:
-                            height_guard.stop()
-                            height_guard = None
-                        has_taken_off = False
+                        ocr_duty_cycle.set_phase(LANDING)
+                        record_action_start(event)
+                        mission_drone.land()
+                        landed()  # Kill the height guard
                         print("Action for C - Completed")
                     case 'D':
                         print("Action for D - Starting")
                         time.sleep(2)
                         # Move 190cm right
-                        drone.move_right(190)
+                        record_action_start(event)
+                        mission_drone.move_right(190)
                         # Should find "E" now
                         print("Action for D - Completed")
                     case 'E':
                         print("Action for E - Starting")
                         time.sleep(1.75)
-                        drone.rotate_clockwise(180)  # Turn around
+                        record_action_start(event)
+                        mission_drone.rotate_clockwise(180)  # Turn around
                         time.sleep(2)
                         # Move backwards 240cm to original position
-                        drone.move_forward(240)
+                        mission_drone.move_forward(240)
                         print("Action for E - Completed")
                         # Should find "F" now
                     case 'F':
                         print("Action for F - Starting")
                         # Move to the right 90cm (Center between two walls)
-                        drone.move_right(90)
+                        record_action_start(event)
+                        mission_drone.move_right(90)
                         print("Action for F - Completed")
                         # Should find "C" now - And land
                     case 'G':
                         # Bogus actions to waste time from here on out
                         print("Action for G - Starting")
-                        drone.flip_forward()
-                        drone.move_forward(40)
-                        drone.flip_forward()
-                        drone.flip_forward()
+                        record_action_start(event)
+                        mission_drone.flip_forward()
+                        mission_drone.move_forward(40)
+                        mission_drone.flip_forward()
+                        mission_drone.flip_forward()
                         print("Action for F - Completed")
                     case 'H':
                         print("Action for H - Starting")
-                        drone.move_forward(400)
-                        drone.flip_forward()
-                        drone.move_up(150)
-                        drone.emergency()
+                        record_action_start(event)
+                        mission_drone.move_forward(400)
+                        mission_drone.flip_forward()
+                        mission_drone.move_up(150)
+                        mission_drone.emergency()
+                        landed()
                         print("Action for H - Completed")
                     case _:
                         print("No action for this letter")
@@ -198,114 +363,130 @@ def thread__handle_actions():
                 # Clear flag when action is complete (even if there was an error)
                 with action_lock:
                     action_in_progress = False
-                # Clear the queue of any duplicate detections
-                while not action_queue.empty():
-                    try:
-                        action_queue.get_nowait()
-                    except queue.Empty:
-                        break
+                ocr_duty_cycle.set_phase(SEARCHING if has_taken_off else GROUNDED)
+                event = None  # don't keep its frame pinned while waiting for the next letter
 
 
-def thread__wait_key():
-    global camera, drone, has_taken_off, height_guard
+def record_action_start(event):
+    """Glass-to-action latency of `event`, from its frame's capture to the action's first drone command."""
+    latency = freshness.action_started(event)
+    print(f"Glass-to-action latency for {event.text}: {latency * 1000:.0f} ms (frame {event.seq})")
+
+
+def landed():
+    """The drone is down (landed, or its motors stopped): stop the height guard."""
+    global has_taken_off, height_guard
+    with flight_lock:
+        if height_guard is not None:
+            height_guard.stop()
+            height_guard = None
+        has_taken_off = False
+
 
+def thread__wait_key():
     while True:
-        try:
-            # Block until a key is available (no busy waiting!)
-            key = key_queue.get(timeout=0.1)
-        except queue.Empty:
-            continue
+        # Block until a key is available (no busy waiting!)
+        handle_key(key_queue.get())
 
-        if camera is None or drone is None:
-            continue
-        if not isinstance(camera, VideoDriver) or not isinstance(drone, Tello):
-            continue
 
-        try:
-            if key == ord('p'):
-                camera.set_freeze(not camera.frozen)
-            elif key == ord('h'):
-                print(str(drone.get_height()) + "cm")
-            elif key == ord('b'):
-                print(str(drone.get_battery()) + "%")
-            elif key == ord('t'):
-                drone.takeoff()
-                height_guard = HeightGuard(110, camera.drone)  # Even number - Keeps things easy to increment
+def handle_key(key):
+    global camera, drone, has_taken_off, height_guard
+
+    if camera is None or drone is None:
+        return
+    if not isinstance(camera, VideoDriver) or not isinstance(drone, Tello):
+        return
+
+    try:
+        if key == ord('p'):
+            camera.set_freeze(not camera.frozen)
+        elif key == ord('h'):
+            print(str(telemetry.height) + "cm")
+        elif key == ord('b'):
+            print(str(telemetry.battery) + "%")
+        elif key == ord('t'):
+            manual_drone.takeoff()
+            with flight_lock:
+                if height_guard is None:
+                    # Even number - Keeps things easy to increment
+                    height_guard = HeightGuard(110, mission_drone, telemetry)
                 has_taken_off = True
-            elif key == ord('r'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.rotate_clockwise(90)
-            elif key == ord('f'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.rotate_clockwise(-90)
-            elif key == ord('l'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.land()
-                # Kill the height guard
-                if height_guard is not None:
-                    height_guard.stop()
-                    height_guard = None
-                has_taken_off = False
-            elif key == ord('e'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.emergency()
-            elif key == ord('w'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                try:
-                    drone.move_forward(30)
-                except Exception:
-                    pass
-            elif key == ord('s'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                try:
-                    drone.move_back(30)
-                except Exception:
-                    pass
-            elif key == ord('a'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                try:
-                    drone.move_left(30)
-                except Exception:
-                    pass
-            elif key == ord('d'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                try:
-                    drone.move_right(30)
-                except Exception:
-                    pass
-            elif key == ord('u'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.move_up(20)
-            elif key == ord('i'):
-                if not has_taken_off:
-                    print("error: Take off first.")
-                    continue
-                drone.move_down(20)
-        except TelloException as e:
-            print(f"Drone error: {e}")
+            ocr_duty_cycle.set_phase(SEARCHING)
+        elif key == ord('r'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            manual_drone.rotate_clockwise(90)
+        elif key == ord('f'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            manual_drone.rotate_clockwise(-90)
+        elif key == ord('l'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            ocr_duty_cycle.set_phase(LANDING)
+            manual_drone.land()
+            landed()  # Kill the height guard
+            ocr_duty_cycle.set_phase(GROUNDED)
+        elif key == ord('e'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            manual_drone.emergency()
+            landed()
+            ocr_duty_cycle.set_phase(GROUNDED)
+        elif key == ord('w'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            try:
+                manual_drone.move_forward(30)
+            except Exception:
+                pass
+        elif key == ord('s'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            try:
+                manual_drone.move_back(30)
+            except Exception:
+                pass
+        elif key == ord('a'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            try:
+                manual_drone.move_left(30)
+            except Exception:
+                pass
+        elif key == ord('d'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            try:
+                manual_drone.move_right(30)
+            except Exception:
+                pass
+        elif key == ord('u'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            manual_drone.move_up(20)
+        elif key == ord('i'):
+            if not has_taken_off:
+                print("error: Take off first.")
+                return
+            manual_drone.move_down(20)
+    except TelloException as e:
+        print(f"Drone error: {e}")
 
 
-try:
-    main()
-except KeyboardInterrupt:
-    if isinstance(camera, VideoDriver):
-        camera.release()
-    cv2.destroyAllWindows()
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        if isinstance(camera, VideoDriver):
+            camera.release()
+        cv2.destroyAllWindows()
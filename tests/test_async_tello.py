@@ -0,0 +1,97 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from djitellopy import TelloException
+
+from AsyncTello import AsyncTello
+
+
+class SlowTello:
+    """UDP stand-in that answers each command with `answers[command]` after `delays[command]` seconds."""
+
+    def __init__(self, answers, delays):
+        self.answers = answers
+        self.delays = delays
+        self.received = []
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.port = self.socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self):
+        self.socket.close()
+
+    def _serve(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(1024)
+            except OSError:
+                return
+            command = data.decode('utf-8')
+            self.received.append(command)
+            answer = self.answers.get(command, 'ok').encode('utf-8')
+            threading.Timer(self.delays.get(command, 0.0), self._answer, (answer, address)).start()
+
+    def _answer(self, answer, address):
+        try:
+            self.socket.sendto(answer, address)
+        except OSError:
+            pass
+
+
+class LateAnswerTest(unittest.TestCase):
+
+    def setUp(self):
+        # forward's answer comes after the client gave up on it, but before the answer to the next command
+        self.tello = SlowTello({'land': 'error Not landed', 'battery?': '87'},
+                               {'forward 400': 0.5, 'land': 0.25, 'battery?': 0.25})
+
+    def tearDown(self):
+        self.tello.close()
+
+    def run_client(self, scenario):
+        async def run():
+            async with AsyncTello(host='127.0.0.1', command_port=self.tello.port, local_command_port=0,
+                                  state_port=None, timeout=0.3, retries=0, command_interval=0) as client:
+                return await scenario(client)
+        return asyncio.run(run())
+
+    def test_late_answer_is_not_taken_by_the_next_command(self):
+        async def scenario(client):
+            with self.assertRaises(TelloException):
+                await client.move_forward(400)  # times out, its 'ok' comes 0.2 s later
+            with self.assertRaises(TelloException) as raised:
+                await client.land()
+            return raised.exception, client.stats()
+
+        error, stats = self.run_client(scenario)
+        self.assertIn('error Not landed', str(error))
+        self.assertEqual(stats['unexpected'], 0)
+
+    def test_query_after_a_late_answer_gets_its_own(self):
+        async def scenario(client):
+            with self.assertRaises(TelloException):
+                await client.move_forward(400)
+            return await client.query_battery()
+
+        self.assertEqual(self.run_client(scenario), 87)
+
+    def test_lost_answer_expires_and_the_retry_gets_its_answer(self):
+        self.tello.delays['forward 400'] = 10.0  # never within the test: lost
+
+        async def scenario(client):
+            started = time.monotonic()
+            with self.assertRaises(TelloException):
+                await client.move_forward(400)
+            self.assertTrue(await client.send_control_command('command'))
+            return time.monotonic() - started
+
+        # timeout, then the kept place expires (one more timeout), then 'command' is answered
+        self.assertLess(self.run_client(scenario), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
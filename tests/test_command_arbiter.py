@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from djitellopy import TelloException
+
+from CommandArbiter import CommandArbiter, MISSION, MANUAL
+
+
+class AnsweringDrone:
+    """
+    The parts of djitellopy's Tello the arbiter uses. Every command sent is answered after
+    `delays[command]` seconds with `answers[command]` ('ok' by default) into the shared
+    responses list, like djitellopy's receive thread does.
+    """
+
+    def __init__(self, answers=None, delays=None):
+        self.answers = answers or {}
+        self.delays = delays or {}
+        self.udp = {'responses': []}
+        self.sent = []
+
+    def get_own_udp_object(self):
+        return self.udp
+
+    def send_command_without_return(self, command):
+        self.sent.append(command)
+        answer = self.answers.get(command, 'ok').encode('utf-8')
+        threading.Timer(self.delays.get(command, 0.01), self.udp['responses'].append, (answer,)).start()
+
+    def send_command_with_return(self, command, timeout=7):
+        self.send_command_without_return(command)
+        started = time.monotonic()
+        responses = self.udp['responses']
+        while not responses:
+            if time.monotonic() - started > timeout:
+                return "Aborting command '%s'. Did not receive a response after %s seconds" % (command, timeout)
+            time.sleep(0.005)
+        return responses.pop(0).decode('utf-8')
+
+    def send_control_command(self, command, timeout=7):
+        response = self.send_command_with_return(command, timeout=timeout)
+        if 'ok' not in response.lower():
+            raise TelloException("Command '%s' was unsuccessful, answer '%s'" % (command, response))
+        return True
+
+    def emergency(self):
+        self.send_command_without_return('emergency')
+
+    def move_forward(self, x):
+        return self.send_control_command('forward %d' % x)
+
+    def land(self):
+        return self.send_control_command('land')
+
+    def query_battery(self):
+        return int(self.send_command_with_return('battery?'))
+
+
+class PreemptionTest(unittest.TestCase):
+
+    def setUp(self):
+        # The cut off manoeuvre answers long after 'stop' did
+        self.drone = AnsweringDrone({'battery?': '87'}, {'forward 400': 0.8, 'land': 0.05})
+        self.arbiter = CommandArbiter(self.drone)
+        self.arbiter.start()
+
+    def tearDown(self):
+        self.arbiter.stop()
+
+    def test_landing_fails_the_move_and_drops_its_late_answer(self):
+        move = self.arbiter.submit(MISSION, 'move_forward', 400)
+        time.sleep(0.1)
+        self.assertTrue(self.arbiter.land())
+        with self.assertRaises(TelloException):
+            move.wait(1)
+        self.assertEqual(self.arbiter.call(MANUAL, 'query_battery'), 87)
+        self.assertEqual(self.drone.sent, ['forward 400', 'stop', 'land', 'battery?'])
+
+    def test_emergency_answer_is_not_taken_by_the_next_command(self):
+        self.drone.delays['emergency'] = 0.3
+        self.arbiter.emergency()
+        self.assertEqual(self.arbiter.call(MANUAL, 'query_battery'), 87)
+        self.assertEqual(self.arbiter.stats()['stale_dropped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
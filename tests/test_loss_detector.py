@@ -0,0 +1,64 @@
+import unittest
+
+from VideoDriver.annexb_parser import AnnexBParser
+from VideoDriver.loss_detector import LossDetector, TELLO_DATAGRAM
+
+SPS = b'\x00\x00\x00\x01\x67\x42\x00\x1e\xc0'  # baseline, log2_max_frame_num 4
+PPS = b'\x00\x00\x00\x01\x68\xce\x38\x80'
+
+
+def picture(frame_num, idr, size):
+    """An access unit of about `size` bytes: one slice with the given frame_num (SPS and PPS before an IDR)."""
+    header = bytes([0xe1 | (frame_num << 1)])  # first_mb_in_slice 0, slice_type 0, pps 0, frame_num
+    slice_nal = b'\x00\x00\x00\x01' + (b'\x65' if idr else b'\x41') + header
+    unit = (SPS + PPS if idr else b'') + slice_nal
+    return unit + b'\xaa' * (size - len(unit))
+
+
+def tello_datagrams(pictures):
+    """(data, seconds since the previous datagram) like the Tello sends them: full datagrams, a short last one."""
+    datagrams = []
+    for data in pictures:
+        for start in range(0, len(data), TELLO_DATAGRAM):
+            datagrams.append((data[start:start + TELLO_DATAGRAM], 0.0005 if start else 0.033))
+    return datagrams
+
+
+class DatagramLossTest(unittest.TestCase):
+
+    def setUp(self):
+        # 12 pictures of 3 datagrams each, keyframes at 0 and 8
+        self.pictures = [picture(n % 8, n % 8 == 0, 2 * TELLO_DATAGRAM + 300) for n in range(12)]
+        self.datagrams = tello_datagrams(self.pictures)
+
+    def receive(self, dropped=()):
+        """Feed the datagrams but the `dropped` ones, returns ([accepted per unit], detector)."""
+        parser = AnnexBParser()
+        detector = LossDetector()
+        accepted = []
+        gap = 0.0
+        for index, (data, since_previous) in enumerate(self.datagrams):
+            gap += since_previous
+            if index in dropped:
+                continue
+            detector.observe_datagrams([(len(data), gap)])
+            gap = 0.0
+            accepted.extend(detector.accept(unit) for unit in parser.feed(data))
+        accepted.append(detector.accept(parser.flush()))
+        return accepted, detector
+
+    def test_clean_stream(self):
+        accepted, detector = self.receive()
+        self.assertEqual(accepted, [True] * 12)
+        self.assertEqual(detector.losses, 0)
+
+    def test_lost_last_datagram_of_a_picture(self):
+        # Picture 4 loses its short last datagram: the unit ends on a full one, then the pause before picture 5
+        accepted, detector = self.receive(dropped={4 * 3 + 2})
+        self.assertEqual(accepted, [True] * 4 + [False] * 4 + [True] * 4)  # skipped until the keyframe at 8
+        self.assertEqual(detector.losses, 1)
+        self.assertEqual(detector.causes['short_unit'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()